@@ -4,5 +4,7 @@ CONFIG = {
     "URL_VERSION": "https://raw.githubusercontent.com/yBlackH4t/controle-estoque-updates/main/version.txt",
     "URL_INSTALLER": "https://github.com/yBlackH4t/controle-estoque-updates/releases/latest/download/Instalador_Estoque.exe",
     "THEME": "dark",
-    "COLOR": "blue"
+    "COLOR": "blue",
+    "IMAGE_CACHE_MB": 32,
+    "DEBUG_TOTALS": False # Confere os totais mantidos por deltas a cada alteração
 }
\ No newline at end of file
@@ -1,5 +1,7 @@
+import multiprocessing
 from views.app_gui import App
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support() # Pool de processos no executável (importação de fotos)
     app = App()
     app.mainloop()
\ No newline at end of file
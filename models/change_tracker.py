@@ -0,0 +1,60 @@
+import os
+from types import SimpleNamespace
+
+def file_signature(path):
+    """(tamanho, mtime) do arquivo, ou None se ele não existe."""
+    if not path or not os.path.exists(path): return None
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+class ChangeTracker:
+    """Acompanha o que mudou desde o último load/save para gravar só isso.
+
+    Posições são as do DataFrame atual. `base_rows` é quantas linhas da
+    planilha em disco continuam no DataFrame (sempre as primeiras); o que
+    vier depois delas foi cadastrado e precisa ser acrescentado.
+    """
+    def __init__(self, stock):
+        self.stock = stock
+        self.reset()
+        stock.subscribe(self._on_stock_event)
+
+    def reset(self):
+        self.loaded_rows = self.stock.row_count() # Linhas de dados no arquivo
+        self.base_rows = self.loaded_rows
+        self.cells = set() # (posição, coluna) alteradas em linhas já existentes
+        self.deleted = [] # Posições removidas da planilha, em ordem cronológica
+        self.full = False # Força reescrita completa (ex.: gravação anterior falhou)
+        self.signature = file_signature(self.stock.file_path)
+
+    def _on_stock_event(self, event, index):
+        if event == "loaded":
+            self.reset()
+        elif event == "changed":
+            if index < self.base_rows:
+                self.cells.update({(index, 2), (index, 3)})
+        elif event == "batch":
+            for row in index[index < self.base_rows].tolist():
+                self.cells.update({(row, 2), (row, 3)})
+        elif event == "removed":
+            if index < self.base_rows:
+                self.deleted.append(index)
+                self.base_rows -= 1
+            self.cells = {(p - 1 if p > index else p, c) for p, c in self.cells if p != index}
+
+    def has_changes(self):
+        return bool(self.full or self.cells or self.deleted or self.stock.row_count() > self.base_rows)
+
+    def snapshot(self):
+        """Congela as alterações para uma gravação e recomeça a contagem do df atual."""
+        snap = SimpleNamespace(loaded_rows=self.loaded_rows, base_rows=self.base_rows, cells=set(self.cells),
+                               deleted=list(self.deleted), full=self.full, signature=self.signature,
+                               dirty=self.has_changes())
+        self.reset()
+        self.signature = snap.signature # Só muda quando a gravação terminar
+        return snap
+
+    def finish(self, signature=None):
+        """Gravação concluída (assinatura nova) ou falhou (None: próxima reescreve tudo)."""
+        if signature is None: self.full = True
+        else: self.signature = signature
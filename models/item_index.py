@@ -0,0 +1,91 @@
+import pandas as pd
+
+def id_key(value):
+    """Chave do ID: 12, 12.0 e '12' são o mesmo item; códigos não numéricos ficam como texto."""
+    if isinstance(value, str):
+        value = value.strip()
+        try: num = float(value.replace(",", "."))
+        except ValueError: return value
+    else:
+        num = value
+    try:
+        if pd.isna(num): return None
+        return int(num) if float(num).is_integer() else float(num)
+    except (TypeError, ValueError):
+        return str(value)
+
+def name_key(name):
+    return str(name).strip().casefold()
+
+class ItemIndex:
+    """Índices ID -> linha e nome -> linha, mais o maior ID numérico.
+
+    Guarda o uid estável de cada linha (StockTable.uid), e a posição atual
+    sai de StockTable.locate na consulta: 'removed' não custa nada aqui e
+    não obriga a compactar a tabela. 'loaded' reconstrói tudo e 'added'
+    acrescenta a linha nova. Chave repetida guarda a lista de uids (vale a
+    primeira linha ainda viva). O maior ID nunca diminui: um ID removido
+    não é reaproveitado por um cadastro novo.
+    """
+    def __init__(self, stock):
+        self.stock = stock
+        self.by_id = {} # chave -> uid, ou [uids] se repetida
+        self.by_name = {}
+        self.max_id = None
+        stock.subscribe(self._on_stock_event)
+
+    def _on_stock_event(self, event, index):
+        if event == "loaded":
+            self.max_id = None
+            self.rebuild()
+        elif event == "added":
+            self._add(index)
+
+    def rebuild(self):
+        table = self.stock.table
+        self.by_id, self.by_name = {}, {}
+        if table is None: return
+        ids = pd.Series(table.column(0))
+        nums = pd.to_numeric(ids, errors="coerce")
+        integral = nums.notna() & (nums % 1 == 0)
+        keys = [int(n) if ok else id_key(v) for v, n, ok in zip(ids.tolist(), nums.tolist(), integral.tolist())]
+        names = pd.Series(table.column(1)).astype(str).str.strip().str.casefold().tolist()
+        for uid, key, name in zip(table.uids().tolist(), keys, names):
+            if key is not None: self._put(self.by_id, key, uid)
+            self._put(self.by_name, name, uid)
+        top = nums.max()
+        if pd.notna(top): self.max_id = max(int(top), self.max_id or 0)
+
+    @staticmethod
+    def _put(index, key, uid):
+        entry = index.get(key)
+        if entry is None: index[key] = uid
+        elif isinstance(entry, list): entry.append(uid)
+        else: index[key] = [entry, uid]
+
+    def _add(self, pos):
+        uid = self.stock.table.uid(pos)
+        key = id_key(self.stock.cell(pos, 0))
+        if key is not None: self._put(self.by_id, key, uid)
+        self._put(self.by_name, name_key(self.stock.cell(pos, 1)), uid)
+        if isinstance(key, (int, float)): self.max_id = max(int(key), self.max_id or 0)
+
+    def _find(self, index, key):
+        entry = index.get(key)
+        if entry is None: return None
+        table = self.stock.table
+        for uid in (entry if isinstance(entry, list) else (entry,)):
+            pos = table.locate(uid)
+            if pos is not None: return pos
+        return None
+
+    def find_id(self, item_id):
+        return self._find(self.by_id, id_key(item_id))
+
+    def find_name(self, name):
+        return self._find(self.by_name, name_key(name))
+
+    def next_id(self):
+        """Próximo ID livre (sem ID numérico na planilha: quantidade de linhas + 1)."""
+        if self.max_id is None: return self.stock.row_count() + 1
+        return self.max_id + 1
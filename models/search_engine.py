@@ -0,0 +1,230 @@
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+FILTERS = ["Todos", "Saldo Canoas", "Zero Canoas", "Saldo PF", "Zero PF"]
+
+# Marcas combinantes que o NFKD separa das letras ('é' -> 'e' + acento)
+COMBINING = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+
+def normalize_text(text):
+    """Minúsculas e sem acentos ('Peça' -> 'peca'); outros símbolos (°, ×, ß) ficam."""
+    return COMBINING.sub("", unicodedata.normalize("NFKD", str(text))).lower()
+
+def normalize_series(series):
+    """Versão vetorizada de normalize_text para uma coluna inteira (mesmo resultado)."""
+    return series.astype(str).str.normalize("NFKD").str.replace(COMBINING, "", regex=True).str.lower()
+
+def trigrams(text):
+    """Trigramas com bordas ('  ab', ' ab', 'abc'...), sobre o texto normalizado."""
+    text = f"  {' '.join(normalize_text(text).split())} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TrigramIndex:
+    """Índice invertido trigrama -> nomes, para busca tolerante a erros de digitação.
+
+    Indexa nomes distintos (com contagem de linhas): cada nome recebe um id e
+    as postagens guardam ids. Nomes excluídos ficam marcados como mortos até
+    a próxima reconstrução, então add/remove não reescrevem as listas.
+    """
+    def __init__(self, names=()):
+        self.postings = defaultdict(list) # trigrama -> ids
+        self._arrays = {} # cache numpy das postagens consultadas
+        self.ids = {} # nome -> id
+        self.counts = {} # nome -> quantidade de linhas
+        self.names = [] # id -> nome
+        self.sizes = [] # id -> nº de trigramas
+        self.alive = [] # id -> ainda indexado?
+        self._vectors = None # (sizes, alive) em numpy, refeitos após alterações
+        for name in names: self.add(name)
+
+    @classmethod
+    def from_names(cls, names, normalized=False, chunk=20000):
+        """Mesmo índice que TrigramIndex(names), com os trigramas gerados em numpy.
+
+        Cada texto vira uma linha de code points (UTF-32) e cada trigrama um
+        uint64 (3 x 21 bits); pares (trigrama, id) repetidos saem por ordenação.
+        normalized=True pula normalize_text (nomes já normalizados, como os do SearchEngine).
+        """
+        index = cls()
+        codes, uniques = pd.factorize(pd.Series(list(names), dtype=object))
+        if not len(uniques): return index
+        texts = pd.Series(uniques, dtype=object)
+        if not normalized: texts = normalize_series(texts)
+        texts = ("  " + texts.str.replace(r"\s+", " ", regex=True).str.strip() + " ").tolist()
+        grams, owners = [], []
+        for start in range(0, len(texts), chunk):
+            block = np.array(texts[start:start + chunk], dtype=str)
+            cp = block.view(np.uint32).reshape(len(block), -1).astype(np.uint64)
+            tri = (cp[:, :-2] << np.uint64(42)) | (cp[:, 1:-1] << np.uint64(21)) | cp[:, 2:]
+            valid = np.arange(tri.shape[1]) < (np.char.str_len(block) - 2)[:, None]
+            grams.append(tri[valid])
+            owners.append(np.nonzero(valid)[0] + start)
+        grams, owners = np.concatenate(grams), np.concatenate(owners)
+        order = np.lexsort((owners, grams))
+        grams, owners = grams[order], owners[order]
+        keep = np.r_[True, (grams[1:] != grams[:-1]) | (owners[1:] != owners[:-1])]
+        grams, owners = grams[keep], owners[keep]
+
+        starts = np.flatnonzero(np.r_[True, grams[1:] != grams[:-1]])
+        mask = (1 << 21) - 1
+        for code, ids in zip(grams[starts].tolist(), np.split(owners, starts[1:])):
+            index.postings[chr(code >> 42) + chr((code >> 21) & mask) + chr(code & mask)] = ids.tolist()
+        index.names = list(uniques)
+        index.ids = {name: i for i, name in enumerate(index.names)}
+        index.counts = dict(zip(index.names, np.bincount(codes, minlength=len(uniques)).tolist()))
+        index.sizes = np.bincount(owners, minlength=len(uniques)).tolist()
+        index.alive = [True] * len(uniques)
+        return index
+
+    def add(self, name):
+        if name in self.counts:
+            self.counts[name] += 1; return
+        self.counts[name] = 1
+        grams = trigrams(name)
+        new_id = len(self.names)
+        self.ids[name] = new_id
+        self.names.append(name); self.sizes.append(len(grams)); self.alive.append(True)
+        self._vectors = None
+        for g in grams:
+            self.postings[g].append(new_id)
+            self._arrays.pop(g, None)
+
+    def remove(self, name):
+        if name not in self.counts: return
+        self.counts[name] -= 1
+        if self.counts[name] > 0: return
+        del self.counts[name]
+        self.alive[self.ids.pop(name)] = False
+        self._vectors = None
+
+    def _posting(self, g):
+        arr = self._arrays.get(g)
+        if arr is None:
+            arr = self._arrays[g] = np.fromiter(self.postings.get(g, ()), dtype=np.int64)
+        return arr
+
+    def search(self, text, limit=20):
+        """Top-N (similaridade de Jaccard, nome), contando trigramas em comum com bincount."""
+        q = trigrams(text)
+        if not q or not self.names: return []
+        if self._vectors is None: self._vectors = (np.asarray(self.sizes), np.asarray(self.alive))
+        sizes, alive = self._vectors
+        hits = np.bincount(np.concatenate([self._posting(g) for g in q]), minlength=len(self.names))
+        score = hits / (len(q) + sizes - hits)
+        score[~alive] = 0
+        top = np.argpartition(-score, min(limit, len(score)) - 1)[:limit]
+        top = top[np.argsort(-score[top], kind="stable")]
+        return [(float(score[i]), self.names[i]) for i in top if score[i] > 0]
+
+class SearchEngine:
+    """Busca de produtos com coluna de nomes normalizada e filtros vetorizados.
+
+    Acompanha o StockManager pelos eventos de alteração, então a coluna
+    normalizada nunca é recalculada inteira fora do carregamento.
+    """
+    def __init__(self, stock):
+        self.stock = stock
+        self._names = [] # Nomes normalizados, mesma ordem do df (lista: cadastro/exclusão sem copiar)
+        self._array = None # Os mesmos nomes em array numpy de str, montado na próxima consulta
+        self.version = 0
+        self._last = None # (versão, termo, índices que contêm o termo)
+        self.fuzzy = None # TrigramIndex pronto
+        self._fuzzy_job = None # Montagem em segundo plano desde o 'loaded' (ver _fuzzy_index)
+        stock.subscribe(self._on_stock_event)
+
+    def _on_stock_event(self, event, index):
+        if event == "loaded":
+            self._names = normalize_series(pd.Series(self.stock.table.column(1))).tolist()
+            self._array = np.array(self._names, dtype=str)
+            self._start_fuzzy()
+        elif event == "added":
+            name = normalize_text(self.stock.cell(index, 1))
+            self._names.append(name)
+            self._array = None
+            self._fuzzy_update("add", name)
+        elif event == "removed":
+            self._fuzzy_update("remove", self._names[index])
+            del self._names[index]
+            self._array = None
+        else:
+            return # Movimentações não mudam nomes
+        self.version += 1
+
+    def _start_fuzzy(self):
+        """Monta o índice de trigramas numa thread, para a primeira busca aproximada não travar a tela."""
+        job = {"names": list(self._names), "index": None, "pending": []}
+        def run():
+            try: job["index"] = TrigramIndex.from_names(job["names"], normalized=True)
+            except Exception as e: print(f"Erro no índice de busca aproximada: {e}")
+        job["thread"] = threading.Thread(target=run, daemon=True)
+        self.fuzzy, self._fuzzy_job = None, job
+        job["thread"].start()
+
+    def _fuzzy_update(self, op, name):
+        if self.fuzzy is not None: getattr(self.fuzzy, op)(name)
+        elif self._fuzzy_job: self._fuzzy_job["pending"].append((op, name)) # Aplicado quando a thread terminar
+
+    def _fuzzy_index(self):
+        job = self._fuzzy_job
+        if self.fuzzy is None and job:
+            job["thread"].join() # Normalmente já terminou
+            self.fuzzy, self._fuzzy_job = job["index"], None
+            if self.fuzzy is not None:
+                for op, name in job["pending"]: getattr(self.fuzzy, op)(name)
+        if self.fuzzy is None: self.fuzzy = TrigramIndex.from_names(self._names, normalized=True)
+        return self.fuzzy
+
+    @property
+    def names(self):
+        if self._array is None: self._array = np.array(self._names, dtype=str)
+        return self._array
+
+    def filter_mask(self, flt):
+        """Máscara booleana do filtro de saldo (opções de var_filter)."""
+        table = self.stock.table # Colunas vivas direto da tabela: não compacta a cada tecla
+        c, pf = table.column(2), table.column(3)
+        if flt == "Saldo Canoas": return c > 0
+        if flt == "Zero Canoas": return c <= 0
+        if flt == "Saldo PF": return pf > 0
+        if flt == "Zero PF": return pf <= 0
+        return np.ones(len(c), dtype=bool)
+
+    def _term_rows(self, term):
+        """Índices cujo nome contém o termo; refina o resultado anterior ao digitar mais letras."""
+        if not term: return np.arange(len(self._names))
+        last = self._last
+        if last and last[0] == self.version and term.startswith(last[1]):
+            candidates = last[2]
+            hits = candidates[np.char.find(self.names[candidates], term) >= 0]
+        else:
+            hits = np.flatnonzero(np.char.find(self.names, term) >= 0)
+        self._last = (self.version, term, hits)
+        return hits
+
+    def query(self, term, flt="Todos"):
+        """Índices (ordem da planilha) que batem com o termo e o filtro."""
+        if self.stock.table is None: return np.empty(0, dtype=np.int64)
+        rows = self._term_rows(normalize_text(term))
+        if flt != "Todos": rows = rows[self.filter_mask(flt)[rows]]
+        return rows
+
+    def fuzzy_query(self, term, flt="Todos", limit=20):
+        """Índices das linhas mais parecidas com o termo, do mais ao menos similar."""
+        if self.stock.table is None or not term.strip(): return np.empty(0, dtype=np.int64)
+        ranked = [name for _, name in self._fuzzy_index().search(term, limit)]
+        rank = {name: pos for pos, name in enumerate(ranked)}
+        rows = np.flatnonzero(np.isin(self.names, ranked))
+        if flt != "Todos": rows = rows[self.filter_mask(flt)[rows]]
+        return rows[np.argsort([rank[self._names[r]] for r in rows], kind="stable")]
+
+    def matches(self, index, term, flt="Todos"):
+        """Teste de uma única linha (usado ao atualizar linha a linha)."""
+        term = normalize_text(term)
+        if term and term not in self._names[index]: return False
+        if flt == "Todos": return True
+        c, pf = self.stock.cell(index, 2), self.stock.cell(index, 3)
+        return {"Saldo Canoas": c > 0, "Zero Canoas": c <= 0, "Saldo PF": pf > 0, "Zero PF": pf <= 0}.get(flt, True)
@@ -1,56 +1,189 @@
+import numpy as np
 import pandas as pd
 import os
-import shutil
 from datetime import datetime
+from models.search_engine import SearchEngine
+from services.workbook_cache import WorkbookCache
+from services.backup_manager import BackupStore
+from services.workbook_loader import read_workbook
+from services.workbook_writer import patch_workbook, write_full
+from services.journal import MovementJournal
+from models.change_tracker import ChangeTracker, file_signature
+from models.item_index import ItemIndex
+from models.stock_table import StockTable
+from models.stock_totals import StockTotals
+from services.batch_movements import BatchError
 
 class StockManager:
     def __init__(self):
-        self.df = None
+        self.table = None # StockTable: buffers de cadastro e lápides de exclusão
+        self.totals = StockTotals() # Totais e contagens por filtro, atualizados por deltas
+        self.debug_totals = False # Confere os totais contra uma varredura a cada evento (lento)
         self.file_path = None
         self.history_path = None
         self.history_buffer = [] # Nome correto da variável
+        self.listeners = [] # Callbacks de alteração (event, index)
+        self.search = SearchEngine(self) # Índice de busca mantido pelos eventos
+        self.cache = WorkbookCache() # DataFrame limpo em pickle ao lado do .xlsx
+        self.changes = ChangeTracker(self) # Células/linhas alteradas desde o último save
+        self.item_index = ItemIndex(self) # ID/nome -> linha e maior ID, mantidos pelos eventos
+        self.journal = None # Journal das movimentações ainda não salvas no Excel
+        self._replay_line = None # Linha de histórico original durante o replay
+
+    @property
+    def df(self):
+        """DataFrame compactado com as linhas atuais (posições = índices dos eventos)."""
+        return None if self.table is None else self.table.frame()
+
+    @df.setter
+    def df(self, df):
+        self.table = None if df is None else StockTable(df)
+        # Única varredura completa dos saldos; daqui em diante só deltas
+        if self.table is None: self.totals.recompute((), ())
+        else: self.totals.recompute(self.table.column(2), self.table.column(3))
+
+    def row_count(self):
+        return 0 if self.table is None else len(self.table)
+
+    def cell(self, index, col):
+        """Valor de uma célula sem montar o DataFrame inteiro."""
+        return self.table.get(index, col)
+
+    def row(self, index):
+        return self.table.row(index)
+
+    def subscribe(self, callback):
+        """Registra um callback(event, index) chamado a cada alteração de linha."""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def _notify(self, event, index=None):
+        """Publica 'loaded', 'added', 'changed' ou 'removed' com o índice da linha ('batch': array de linhas)."""
+        if self.debug_totals and self.table is not None:
+            diffs = self.check_totals()
+            if diffs: print(f"Totais inconsistentes após '{event}': {diffs}")
+        for callback in list(self.listeners):
+            try:
+                callback(event, index)
+            except Exception as e:
+                print(f"Erro no listener: {e}")
 
     def load_file(self, path):
-        """Carrega e limpa os dados do Excel."""
+        """Carrega e limpa os dados do Excel (ou do cache, se o arquivo não mudou)."""
         try:
-            self.df = pd.read_excel(path, header=0)
-            self.file_path = path
-            
-            # Define caminho do histórico
-            base = os.path.splitext(path)[0]
-            self.history_path = f"{base}_historico.txt"
-            self.history_buffer = []
-
-            # Limpeza de dados (Garante numérico)
-            self.df.iloc[:, 2] = pd.to_numeric(self.df.iloc[:, 2], errors='coerce').fillna(0)
-            self.df.iloc[:, 3] = pd.to_numeric(self.df.iloc[:, 3], errors='coerce').fillna(0)
-            return True, "Carregado com sucesso"
+            df, from_cache = self.read_file(path)
+            replayed = self.apply_loaded(path, df)
+            msg = "Carregado do cache" if from_cache else "Carregado com sucesso"
+            if replayed: msg += f"\n{replayed} movimentações não salvas foram recuperadas."
+            return True, msg
         except Exception as e:
             return False, str(e)
 
-    def add_item(self, name, qty_c, qty_pf):
-        """Adiciona um novo item ao DataFrame."""
-        if self.df is None: return False
+    def read_file(self, path, on_progress=None, on_chunk=None):
+        """Lê o Excel (ou o cache) sem alterar o estado: pode rodar numa thread.
+
+        on_progress(lidas, total) e on_chunk(df_parcial) são chamados na
+        thread de leitura; o primeiro bloco já vem limpo.
+        """
+        df = self.cache.load(path)
+        if df is not None: return df, True
+        preview = (lambda chunk: on_chunk(self._clean(chunk.copy()))) if on_chunk else None
+        df = self._clean(read_workbook(path, on_progress=on_progress, on_chunk=preview))
+        self.cache.store(path, df)
+        return df, False
+
+    def apply_loaded(self, path, df):
+        """Instala o DataFrame lido e avisa os listeners (thread principal).
+
+        Retorna quantas movimentações do journal foram reaplicadas.
+        """
+        if self.journal: self.journal.close()
+        self.df = df
+        self.file_path = path
+        
+        # Define caminho do histórico
+        base = os.path.splitext(path)[0]
+        self.history_path = f"{base}_historico.txt"
+        self.history_buffer = []
+
+        self._notify("loaded")
+        return self._replay_journal(f"{base}_journal.jsonl")
+
+    def _replay_journal(self, journal_path):
+        """Reaplica (com eventos normais) o que ficou no journal desde o último save."""
+        self.journal = MovementJournal(journal_path)
+        header, entries = self.journal.read()
+        signature = file_signature(self.file_path)
+        marker = self.journal.read_marker()
+        if entries and header and marker and marker["base"] == header.get("base") and marker["saved"] == list(signature or ()):
+            # Queda entre a troca da planilha e o checkpoint: ela já tem as entradas até o marcador
+            if not marker["history"]:
+                # Termina o passo do histórico daquela gravação
+                with open(self.history_path, "a", encoding="utf-8") as f:
+                    for entry in entries:
+                        if entry["seq"] > marker["seq"]: break
+                        f.writelines(entry["log"] if isinstance(entry["log"], list) else [entry["log"]])
+                    f.flush(); os.fsync(f.fileno())
+            self.journal.checkpoint(signature, marker["seq"])
+            header, entries = self.journal.read()
+        if not entries or not header or header.get("base") != list(signature or ()):
+            if entries:
+                # Journal de outra versão da planilha: guarda, mas não aplica
+                os.replace(journal_path, f"{journal_path}.{datetime.now().strftime('%Y%m%d%H%M%S')}.orphan")
+            self.journal.open(signature)
+            return 0
+        for entry in entries:
+            self._replay_line = entry["log"]
+            try:
+                if entry["op"] == "update":
+                    self.update_stock(entry["index"], entry["operation"], entry["qty"], entry["location"], entry["direction"])
+                elif entry["op"] == "add":
+                    self.add_item(entry["name"], entry["qty_c"], entry["qty_pf"], entry.get("id"))
+                elif entry["op"] == "remove":
+                    self.remove_item(entry["index"])
+                elif entry["op"] == "batch":
+                    self.apply_movements(entry["moves"])
+            except Exception as e:
+                print(f"Entrada do journal ignorada: {e}")
+            finally:
+                self._replay_line = None
+        self.journal.resume(header, entries)
+        return len(entries)
+
+    def _journal(self, entry, line):
+        if self._replay_line is None and self.journal:
+            entry["log"] = line
+            self.journal.append(entry)
+
+    def _clean(self, df):
+        # Limpeza de dados (Garante numérico)
+        df.iloc[:, 2] = pd.to_numeric(df.iloc[:, 2], errors='coerce').fillna(0)
+        df.iloc[:, 3] = pd.to_numeric(df.iloc[:, 3], errors='coerce').fillna(0)
+        return df
+
+    def add_item(self, name, qty_c, qty_pf, item_id=None):
+        """Adiciona um novo item ao DataFrame (`item_id`: ID já atribuído, no replay do journal)."""
+        if self.table is None: return False
         
         try:
-            # Lógica inteligente de ID
-            next_id = 1
-            if not self.df.empty:
-                try:
-                    max_id = pd.to_numeric(self.df.iloc[:, 0], errors='coerce').max()
-                    if pd.notna(max_id): next_id = int(max_id) + 1
-                    else: next_id = len(self.df) + 1
-                except: next_id = len(self.df) + 1
+            # Maior ID mantido pelo índice (sem varrer a coluna a cada cadastro)
+            next_id = self.item_index.next_id() if item_id is None else item_id
 
             # Cria linha compatível com colunas extras
             row_data = [next_id, name, qty_c, qty_pf]
-            current_cols = len(self.df.columns)
+            current_cols = len(self.table.columns)
             if current_cols > 4:
                 row_data.extend([None] * (current_cols - 4))
             
-            new_df = pd.DataFrame([row_data], columns=self.df.columns)
-            self.df = pd.concat([self.df, new_df], ignore_index=True)
-            self.log_memory(name, "CADASTRO", 0, f"C={qty_c}/PF={qty_pf}")
+            self.table.append(row_data) # Sem copiar a tabela: vai para o buffer
+            self.totals.add(qty_c, qty_pf)
+            line = self.log_memory(name, "CADASTRO", 0, f"C={qty_c}/PF={qty_pf}")
+            self._journal({"op": "add", "id": next_id, "name": name, "qty_c": int(qty_c), "qty_pf": int(qty_pf)}, line)
+            self._notify("added", len(self.table) - 1)
             return True
         except Exception as e:
             print(e)
@@ -58,84 +191,254 @@ class StockManager:
 
     def remove_item(self, index):
         """Remove item pelo índice do DataFrame."""
-        if self.df is None: return
-        name = self.df.iat[index, 1]
-        self.log_memory(name, "EXCLUSAO", 0, "Item removido")
-        self.df = self.df.drop(index).reset_index(drop=True)
+        if self.table is None: return
+        name = self.table.get(index, 1)
+        line = self.log_memory(name, "EXCLUSAO", 0, "Item removido")
+        self.totals.remove(self.table.get(index, 2), self.table.get(index, 3))
+        self.table.delete(index) # Lápide; compacta depois
+        self._journal({"op": "remove", "index": int(index)}, line)
+        self._notify("removed", index)
         return name
 
+    def find_by_id(self, item_id):
+        """Linha do item com esse ID (12, 12.0 e '12' equivalem) ou None."""
+        if self.table is None: return None
+        return self.item_index.find_id(item_id)
+
+    def find_by_name(self, name):
+        """Linha do item com esse nome (sem diferenciar maiúsculas/espaços nas pontas) ou None."""
+        if self.table is None: return None
+        return self.item_index.find_name(name)
+
+    def update_stock_by_id(self, item_id, operation, qty, location, transfer_direction=None):
+        """update_stock endereçado pelo ID do produto (leitor de código, integrações)."""
+        index = self.find_by_id(item_id)
+        if index is None: raise ValueError(f"Item com ID {item_id} não encontrado")
+        return self.update_stock(index, operation, qty, location, transfer_direction)
+
     def update_stock(self, index, operation, qty, location, transfer_direction=None):
         """Atualiza quantidades e valida regras de negócio."""
         col_c, col_pf = 2, 3
         # Pega valores atuais
-        bal_c = self.df.iat[index, col_c]
-        bal_pf = self.df.iat[index, col_pf]
-        item_name = self.df.iat[index, 1]
+        table = self.table
+        bal_c = table.get(index, col_c)
+        bal_pf = table.get(index, col_pf)
+        item_name = table.get(index, 1)
         detail = ""
 
         if operation == "Transf":
             detail = transfer_direction
             if "Canoas -> PF" in transfer_direction:
                 if bal_c < qty: raise ValueError(f"Saldo insuficiente em Canoas ({bal_c})")
-                self.df.iat[index, col_c] -= qty
-                self.df.iat[index, col_pf] += qty
+                table.set(index, col_c, bal_c - qty)
+                table.set(index, col_pf, bal_pf + qty)
             else:
                 if bal_pf < qty: raise ValueError(f"Saldo insuficiente em PF ({bal_pf})")
-                self.df.iat[index, col_pf] -= qty # Correção: era qtd no original
-                self.df.iat[index, col_c] += qty
+                table.set(index, col_pf, bal_pf - qty) # Correção: era qtd no original
+                table.set(index, col_c, bal_c + qty)
         else:
             detail = f"{operation} em {location}"
             target_col = col_c if location == "Canoas" else col_pf
             
             if operation == "Saida":
-                current = self.df.iat[index, target_col]
+                current = table.get(index, target_col)
                 if current < qty: raise ValueError(f"Saldo insuficiente. Disp: {current}")
-                self.df.iat[index, target_col] -= qty
+                table.set(index, target_col, current - qty)
             else:
-                self.df.iat[index, target_col] += qty
+                table.set(index, target_col, table.get(index, target_col) + qty)
 
-        self.log_memory(item_name, operation.upper(), qty, detail)
+        self.totals.replace(bal_c, bal_pf, table.get(index, col_c), table.get(index, col_pf))
+        line = self.log_memory(item_name, operation.upper(), qty, detail)
+        self._journal({"op": "update", "index": int(index), "operation": operation, "qty": int(qty),
+                       "location": location, "direction": transfer_direction}, line)
+        self._notify("changed", index)
         return item_name
 
+    def apply_movements(self, movements, source=None):
+        """Aplica um lote de movimentações (CSV, leitor de código) tudo-ou-nada; erro levanta BatchError."""
+        if self.table is None: raise BatchError([(None, "Nenhuma planilha carregada")])
+        if not movements: return {"moves": 0, "items": 0}
+        rows, errors = [], []
+        for m in movements:
+            index = m.get("index")
+            if index is None:
+                index = self.find_by_id(m["item"])
+                if index is None: index = self.find_by_name(m["item"])
+                if index is None: errors.append((m.get("line"), f"Item não encontrado: {m['item']}"))
+            rows.append(-1 if index is None else index)
+        if errors: raise BatchError(errors)
+
+        # Deltas por movimentação nas colunas Canoas (2) e PF (3)
+        n, rows = len(movements), np.asarray(rows, dtype=np.int64)
+        qty = np.array([m["qty"] for m in movements], dtype=np.int64)
+        to_c = np.array([(m["direction"] or "").startswith("PF") if m["operation"] == "Transf" else m["location"] == "Canoas"
+                         for m in movements])
+        sign = np.array([-1 if m["operation"] == "Saida" else 1 for m in movements])
+        transf = np.array([m["operation"] == "Transf" for m in movements])
+        deltas = {2: np.where(to_c, sign * qty, np.where(transf, -qty, 0)),
+                  3: np.where(~to_c, sign * qty, np.where(transf, -qty, 0))}
+
+        # Saldo depois de cada movimentação: ordena por linha (estável) e acumula dentro do grupo
+        order = np.lexsort((np.arange(n), rows))
+        r = rows[order]
+        start = np.r_[True, r[1:] != r[:-1]]
+        sizes = np.diff(np.r_[np.flatnonzero(start), n])
+        for col, place in ((2, "Canoas"), (3, "PF")):
+            d = deltas[col][order]
+            run = np.cumsum(d)
+            run -= np.repeat(run[start] - d[start], sizes)
+            after = self.table.column(col)[r].astype(float) + run
+            bad = np.flatnonzero((d < 0) & (after < 0))
+            bad = bad[np.r_[True, r[bad][1:] != r[bad][:-1]]] if len(bad) else bad # Só a primeira falta de cada item
+            for i in bad:
+                m = movements[order[i]]
+                errors.append((m.get("line"), f"Saldo insuficiente em {place} para {self.table.get(r[i], 1)} "
+                                              f"(disponível {after[i] - d[i]:g}, pedido {-d[i]})"))
+        if errors:
+            errors.sort(key=lambda e: e[0] if e[0] is not None else -1)
+            raise BatchError(errors)
+
+        # Aplica o total de cada item
+        changed, inverse = np.unique(rows, return_inverse=True)
+        sums = {}
+        for col in (2, 3):
+            sums[col] = np.zeros(len(changed), dtype=np.int64)
+            np.add.at(sums[col], inverse, deltas[col])
+        for row, dc, dpf in zip(changed.tolist(), sums[2].tolist(), sums[3].tolist()):
+            old_c, old_pf = self.table.get(row, 2), self.table.get(row, 3)
+            if dc: self.table.set(row, 2, old_c + dc)
+            if dpf: self.table.set(row, 3, old_pf + dpf)
+            self.totals.replace(old_c, old_pf, old_c + dc, old_pf + dpf)
+
+        if self._replay_line is not None:
+            lines = self._replay_line
+        else:
+            dt = datetime.now().strftime("%d/%m/%Y %H:%M:%S") # Mesmo horário: o lote é um bloco só
+            lines = [f"{dt};;;{m['operation'].upper()};;;{self.table.get(row, 1)};;;{m['qty']};;;"
+                     f"{m['direction'] if m['operation'] == 'Transf' else m['operation'] + ' em ' + m['location']}\n"
+                     for m, row in zip(movements, rows.tolist())]
+        self.history_buffer.extend(lines)
+        moves = [{"index": row, "operation": m["operation"], "qty": int(m["qty"]), "location": m["location"],
+                  "direction": m["direction"]} for m, row in zip(movements, rows.tolist())]
+        self._journal({"op": "batch", "moves": moves, "source": source}, lines)
+        self._notify("batch", changed)
+        return {"moves": n, "items": len(changed)}
+
     def log_memory(self, item, op, qty, detail):
         dt = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        msg = f"{dt};;;{op};;;{item};;;{qty};;;{detail}\n"
+        msg = self._replay_line or f"{dt};;;{op};;;{item};;;{qty};;;{detail}\n"
         self.history_buffer.append(msg) # CORRIGIDO: history_buffer
+        return msg
 
     def save_data(self):
-        """Realiza Backup, Salva Excel e Escreve Histórico."""
-        if self.df is None or not self.file_path: return False, "Sem dados"
+        """Realiza Backup, Salva Excel e Escreve Histórico (síncrono)."""
+        if self.table is None or not self.file_path: return False, "Sem dados"
+        job = self.snapshot()
+        try:
+            return True, self.write_snapshot(job)
+        except Exception as e:
+            return False, str(e)
+        finally:
+            self.finish_save(job)
 
+    def snapshot(self):
+        """Copia o estado a gravar (thread principal); edições seguintes vão para o próximo save."""
+        if self.table is None or not self.file_path: return None
+        self.table.compact() # Lápides e buffers saem aqui; df abaixo já é a tabela inteira
+        job = {"path": self.file_path, "history_path": self.history_path, "df": self.df.copy(),
+               "changes": self.changes.snapshot(), "history": self.history_buffer,
+               "signature": None, "workbook_saved": False, "history_saved": False,
+               "journal": self.journal, "journal_base": self.journal.base if self.journal else None,
+               "journal_mark": self.journal.seq if self.journal else 0}
+        self.history_buffer = []
+        return job
+
+    def write_snapshot(self, job):
+        """Grava um snapshot: não toca no estado do StockManager, pode rodar numa thread."""
+        path, changes = job["path"], job["changes"]
+
+        # 1. Backup (deduplicado por conteúdo, com retenção)
         try:
-            # 1. Backup
-            backup_dir = os.path.join(os.path.dirname(self.file_path), "backups")
-            if not os.path.exists(backup_dir): os.makedirs(backup_dir)
-            
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
-            base_name = os.path.splitext(os.path.basename(self.file_path))[0]
-            backup_name = f"{base_name}_{timestamp}.xlsx"
-            
-            try:
-                shutil.copy2(self.file_path, os.path.join(backup_dir, backup_name))
-            except: pass 
+            backup_name = BackupStore.for_workbook(path).backup(path)["id"]
+        except Exception as e:
+            print(f"Erro no backup: {e}")
+            backup_name = "indisponível"
 
-            # 2. Salvar Excel (Proteção contra arquivo aberto)
-            try:
-                self.df.to_excel(self.file_path, index=False)
-            except PermissionError:
-                raise PermissionError("Arquivo aberto no Excel. Feche-o primeiro.")
+        # 2. Salvar Excel (Proteção contra arquivo aberto); o marcador do journal vai junto com a troca
+        journal = job["journal"]
+        def mark(tmp):
+            journal.write_marker(job["journal_base"], file_signature(tmp), job["journal_mark"])
+            job["marked"] = True
+        try:
+            self._write_workbook(path, job["df"], changes, mark if journal else None)
+        except PermissionError:
+            raise PermissionError("Arquivo aberto no Excel. Feche-o primeiro.")
+        job["workbook_saved"] = True
+        job["signature"] = file_signature(path)
 
-            # 3. Salvar Histórico
-            # CORRIGIDO: Verifica self.history_buffer em vez de self.buffer_historico
-            if self.history_buffer and self.history_path:
-                with open(self.history_path, "a", encoding="utf-8") as f:
-                    for line in self.history_buffer: f.write(line)
-                self.history_buffer = []
+        # 3. Salvar Histórico
+        if job["history"] and job["history_path"]:
+            with open(job["history_path"], "a", encoding="utf-8") as f:
+                for line in job["history"]: f.write(line)
+                f.flush(); os.fsync(f.fileno())
+        job["history_saved"] = True
+        if job.get("marked"): journal.write_marker(job["journal_base"], job["signature"], job["journal_mark"], history=True)
+        return backup_name
+
+    def finish_save(self, job):
+        """Aplica o resultado da gravação (thread principal)."""
+        if job is None: return
+        if job["path"] != self.file_path: return # Outra planilha foi aberta no meio
+        self.changes.finish(job["signature"] if job["workbook_saved"] else None)
+        if job["workbook_saved"] and self.journal:
+            # O Excel já contém essas movimentações: saem do journal
+            self.journal.checkpoint(job["signature"], job["journal_mark"])
+        if not job["history_saved"]:
+            # Não gravado: volta para a frente do buffer
+            self.history_buffer = job["history"] + self.history_buffer
+
+    def close(self):
+        """Fecha o journal (fsync final) ao sair."""
+        if self.journal: self.journal.close()
+
+    def list_backups(self):
+        if not self.file_path: return []
+        return BackupStore.for_workbook(self.file_path).versions()
 
-            return True, backup_name
+    def restore_backup(self, version_id):
+        """Restaura uma versão de backup sobre a planilha e recarrega."""
+        if not self.file_path: return False, "Sem dados"
+        try:
+            BackupStore.for_workbook(self.file_path).restore(version_id, self.file_path)
         except Exception as e:
             return False, str(e)
+        return self.load_file(self.file_path)
+
+    def _write_workbook(self, path, df, changes, on_ready=None):
+        """Grava só o que mudou; reescreve tudo se o remendo não for possível (on_ready: ver replace_atomic)."""
+        unchanged = changes.signature is not None and changes.signature == file_signature(path)
+        if unchanged and not changes.dirty: return
+        if unchanged and not changes.full and path.lower().endswith(".xlsx"):
+            try:
+                patch_workbook(path, df, changes, on_ready=on_ready)
+                self.cache.store(path, df)
+                return
+            except PermissionError:
+                raise
+            except Exception as e:
+                print(f"Gravação incremental indisponível, reescrevendo: {e}")
+        write_full(path, df, on_ready)
+        self.cache.store(path, df)
 
     def get_totals(self):
-        if self.df is None: return 0, 0
-        return int(self.df.iloc[:, 2].sum()), int(self.df.iloc[:, 3].sum())
\ No newline at end of file
+        """(total Canoas, total PF), mantidos por deltas: não varre a tabela."""
+        return self.totals.totals()
+
+    def get_counts(self):
+        """Itens por opção do filtro de saldo (ver StockTotals.counts)."""
+        return self.totals.counts()
+
+    def check_totals(self):
+        """Depuração: diferenças entre os totais mantidos e uma recontagem completa."""
+        if self.table is None: return []
+        return self.totals.check(self.table.column(2), self.table.column(3))
\ No newline at end of file
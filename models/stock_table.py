@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+COMPACT_RATIO = 0.25 # Compacta quando as lápides passam de 25% das linhas físicas...
+COMPACT_MIN = 1000 # ...e de pelo menos tantas linhas
+
+class StockTable:
+    """Linhas do estoque por baixo do StockManager, sem copiar a tabela a cada cadastro/exclusão.
+
+    `base` é o DataFrame carregado (ou da última compactação); cadastros vão
+    para buffers numpy por coluna que dobram de capacidade, e exclusões só
+    marcam a linha física como morta (lápide). Posições lógicas são as do
+    DataFrame compactado, então continuam se deslocando na exclusão como
+    antes. frame() compacta (uma cópia só, para vários cadastros/exclusões)
+    quando alguém pede a tabela inteira; snapshot do save e lápides acima do
+    limite também compactam. get/set/row leem e gravam no lugar, em O(1).
+    Cada linha tem um uid estável (crescente na ordem da tabela) que não
+    muda com exclusões nem compactação; locate() dá a posição atual dele.
+    """
+    def __init__(self, df):
+        self.base = df.reset_index(drop=True)
+        self._next_uid = len(self.base)
+        self._reset(np.arange(len(self.base), dtype=np.int64))
+
+    def _reset(self, uids):
+        n = len(self.base)
+        self._uids = np.concatenate([uids, np.zeros(max(n, 16) - n, dtype=np.int64)]) # Físicas, como _alive
+        self._live_uids = None # uids das linhas vivas, na ordem lógica (cache)
+        self._tail = None # Buffers por coluna (criados no primeiro cadastro)
+        self._tail_len = 0
+        self._alive = np.ones(max(n, 16), dtype=bool) # Físicas: base + buffers
+        self._dead = 0
+        self._live = None # Posições físicas das linhas vivas (cache, só com lápides)
+
+    @property
+    def columns(self):
+        return self.base.columns
+
+    @property
+    def physical(self):
+        return len(self.base) + self._tail_len
+
+    def __len__(self):
+        return self.physical - self._dead
+
+    def _pos(self, index):
+        """Posição física da linha lógica `index`."""
+        if not 0 <= index < len(self): raise IndexError(f"Linha {index} fora da tabela")
+        if not self._dead: return index
+        if self._live is None: self._live = np.flatnonzero(self._alive[:self.physical])
+        return int(self._live[index])
+
+    def uid(self, index):
+        return int(self._uids[self._pos(index)])
+
+    def uids(self):
+        """uids das linhas vivas, na ordem da tabela (crescentes)."""
+        if self._live_uids is None:
+            uids = self._uids[:self.physical]
+            self._live_uids = uids[self._alive[:self.physical]] if self._dead else uids.copy()
+        return self._live_uids
+
+    def locate(self, uid):
+        """Posição lógica atual da linha `uid`, ou None se ela foi excluída."""
+        uids = self.uids()
+        pos = int(np.searchsorted(uids, uid))
+        return pos if pos < len(uids) and uids[pos] == uid else None
+
+    def get(self, index, col):
+        pos, nb = self._pos(index), len(self.base)
+        return self.base.iat[pos, col] if pos < nb else self._tail[col][pos - nb]
+
+    def set(self, index, col, value):
+        pos, nb = self._pos(index), len(self.base)
+        if pos < nb: self.base.iat[pos, col] = value
+        else: self._store(col, pos - nb, value)
+
+    def row(self, index):
+        """A linha como Series (mesmo formato de df.iloc[index])."""
+        pos, nb = self._pos(index), len(self.base)
+        if pos < nb: return self.base.iloc[pos]
+        return pd.Series([buf[pos - nb] for buf in self._tail], index=self.columns, name=index, dtype=object)
+
+    def column(self, col):
+        """Valores vivos da coluna (numpy), sem compactar."""
+        values = self.base.iloc[:, col].to_numpy()
+        if self._tail_len: values = np.concatenate([values, self._tail[col][:self._tail_len]])
+        return values[self._alive[:self.physical]] if self._dead else values
+
+    def append(self, values):
+        """Acrescenta uma linha (lista com um valor por coluna); O(1) amortizado."""
+        if self._tail is None:
+            self._tail = [np.empty(16, dtype=self._buffer_dtype(dtype)) for dtype in self.base.dtypes]
+        k = self._tail_len
+        if k == len(self._tail[0]):
+            self._tail = [np.concatenate([buf, np.empty_like(buf)]) for buf in self._tail]
+        if self.physical == len(self._alive):
+            self._alive = np.concatenate([self._alive, np.ones_like(self._alive)])
+            self._uids = np.concatenate([self._uids, np.zeros_like(self._uids)])
+        self._alive[self.physical] = True
+        self._uids[self.physical] = self._next_uid
+        self._next_uid += 1
+        self._live_uids = None
+        for col, value in enumerate(values): self._store(col, k, value)
+        self._tail_len += 1
+        if self._live is not None: self._live = np.append(self._live, self.physical - 1)
+
+    @staticmethod
+    def _buffer_dtype(dtype):
+        return dtype if isinstance(dtype, np.dtype) and dtype.kind in "iufb" else object
+
+    def _store(self, col, k, value):
+        buf = self._tail[col]
+        if buf.dtype != object:
+            if value is None and buf.dtype.kind == "f": value = np.nan
+            elif not self._fits(buf.dtype, value):
+                # Texto, 1.5 numa coluna inteira...: o buffer vira object, como faria o concat
+                buf = self._tail[col] = buf.astype(object)
+        buf[k] = value
+
+    @staticmethod
+    def _fits(dtype, value):
+        kind = np.asarray(value).dtype.kind
+        if dtype.kind == "b": return kind == "b"
+        return kind in ("iub" if dtype.kind in "iu" else "iubf")
+
+    def delete(self, index):
+        """Marca a linha como morta; compacta se as lápides passaram do limite."""
+        pos = self._pos(index)
+        self._alive[pos] = False
+        self._dead += 1
+        self._live_uids = None
+        if self._live is not None: self._live = np.delete(self._live, index)
+        if self._dead >= max(COMPACT_MIN, COMPACT_RATIO * self.physical): self.compact()
+
+    def compact(self):
+        """Aplica lápides e buffers numa cópia só: a base volta a ser a tabela inteira."""
+        if not (self._dead or self._tail_len): return
+        nb = len(self.base)
+        uids = self._uids[:self.physical][self._alive[:self.physical]]
+        parts = [self.base.take(np.flatnonzero(self._alive[:nb])) if self._dead else self.base]
+        if self._tail_len:
+            keep = self._alive[nb:self.physical]
+            tail = pd.DataFrame({col: buf[:self._tail_len][keep] for col, buf in enumerate(self._tail)}).infer_objects()
+            tail.columns = self.columns
+            parts.append(tail)
+        self.base = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+        self._reset(uids)
+
+    def frame(self):
+        """O DataFrame compactado (o `df` do StockManager)."""
+        self.compact()
+        return self.base
@@ -0,0 +1,54 @@
+import numpy as np
+
+class StockTotals:
+    """Totais de Canoas/PF e contagens dos filtros de saldo, mantidos por deltas.
+
+    recompute() varre as colunas (só quando a planilha é carregada); add,
+    remove e replace ajustam em O(1) a cada cadastro, exclusão ou
+    movimentação. check() compara com uma varredura nova, para depuração.
+    """
+    FIELDS = ("items", "total_c", "total_pf", "pos_c", "pos_pf", "with_stock")
+
+    def __init__(self):
+        self.recompute((), ())
+
+    def recompute(self, c, pf):
+        c, pf = np.asarray(c, dtype=float), np.asarray(pf, dtype=float)
+        self.items = len(c)
+        self.total_c, self.total_pf = float(c.sum()), float(pf.sum())
+        self.pos_c, self.pos_pf = int((c > 0).sum()), int((pf > 0).sum())
+        self.with_stock = int(((c > 0) | (pf > 0)).sum())
+
+    def _apply(self, c, pf, sign):
+        c, pf = float(c), float(pf)
+        self.items += sign
+        self.total_c += sign * c
+        self.total_pf += sign * pf
+        self.pos_c += sign * (c > 0)
+        self.pos_pf += sign * (pf > 0)
+        self.with_stock += sign * (c > 0 or pf > 0)
+
+    def add(self, c, pf):
+        self._apply(c, pf, 1)
+
+    def remove(self, c, pf):
+        self._apply(c, pf, -1)
+
+    def replace(self, old_c, old_pf, c, pf):
+        """Linha que passou de (old_c, old_pf) para (c, pf)."""
+        self._apply(old_c, old_pf, -1)
+        self._apply(c, pf, 1)
+
+    def totals(self):
+        return int(self.total_c), int(self.total_pf)
+
+    def counts(self):
+        """Itens em cada opção do filtro de saldo, mais 'Com saldo' (Canoas ou PF)."""
+        return {"Todos": self.items, "Saldo Canoas": self.pos_c, "Zero Canoas": self.items - self.pos_c,
+                "Saldo PF": self.pos_pf, "Zero PF": self.items - self.pos_pf, "Com saldo": self.with_stock}
+
+    def check(self, c, pf):
+        """[(campo, mantido, recontado)] que divergem de uma varredura nova; vazio = consistente."""
+        fresh = StockTotals()
+        fresh.recompute(c, pf)
+        return [(f, getattr(self, f), getattr(fresh, f)) for f in self.FIELDS if getattr(self, f) != getattr(fresh, f)]
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from models.search_engine import normalize_text
+
+PRICE_COLUMNS = ("preco", "valor", "custo")
+
+def price_column(df):
+    """Primeira coluna de preço/valor/custo da planilha, ou None (ABC por quantidade)."""
+    for col in df.columns[4:]:
+        if normalize_text(col).strip().startswith(PRICE_COLUMNS): return col
+    return None
+
+def abc_xyz(df, daily, days=None, location=None, now=None, a_share=0.80, b_share=0.95,
+            x_cv=0.5, y_cv=1.0, period_days=7):
+    """Curva ABC (Pareto) e XYZ (variabilidade) por item da planilha.
+
+    `daily` é o agregado de OutflowAggregate (item, day, location, qty).
+    `days` limita às saídas dos últimos N dias e `location` a um local. Com
+    coluna de preço a ABC é por valor (qtd x preço), senão por quantidade:
+    A até `a_share` do acumulado, B até `b_share`, o resto C. XYZ usa o
+    coeficiente de variação da demanda por período de `period_days` dias:
+    X até `x_cv`, Y até `y_cv`, Z acima ou sem saídas.
+    Retorna um DataFrame ordenado do maior para o menor giro.
+    """
+    now = pd.Timestamp(now or pd.Timestamp.now()).normalize()
+    mov = daily
+    if days: mov = mov[mov["day"] >= now - pd.Timedelta(days=days - 1)]
+    if location: mov = mov[mov["location"] == location]
+
+    names = df.iloc[:, 1].astype(str)
+    items = mov["item"].astype("category") # Já vem categórico do agregado
+    codes, n_items = items.cat.codes.values, len(items.cat.categories)
+    pos = items.cat.categories.get_indexer(names) # Item da planilha -> código (-1 sem saídas)
+    mov_qty = mov["qty"].values.astype(float)
+    totals = np.append(np.bincount(codes, weights=mov_qty, minlength=n_items), 0)
+    qty = totals[pos].astype("int64")
+
+    col = price_column(df)
+    price = pd.to_numeric(df[col], errors="coerce").fillna(0).values if col is not None else None
+    value = qty * price if price is not None else qty.astype(float)
+
+    # Pareto: ordena por valor e classifica pela fatia acumulada *antes* do item
+    order = np.argsort(-value, kind="stable")
+    total = value.sum()
+    share = value[order] / total if total > 0 else np.zeros(len(order))
+    before = np.cumsum(share) - share
+    abc = np.where(share <= 0, "C", np.where(before < a_share, "A", np.where(before < b_share, "B", "C")))
+
+    # XYZ: média e desvio por período sem montar a matriz item x período (zeros entram pela contagem)
+    day_num = lambda d: np.asarray(d, dtype="datetime64[D]").astype(np.int64)
+    start = now - pd.Timedelta(days=days - 1) if days else (mov["day"].min() if len(mov) else now)
+    first = day_num(start) // period_days
+    n_periods = max(int(day_num(now) // period_days - first) + 1, 1)
+    dated = ~np.isnat(mov["day"].values) # Linhas com data ilegível contam no total, não na variação
+    key = codes[dated].astype(np.int64) * n_periods + (day_num(mov["day"].values[dated]) // period_days - first)
+    weights = mov_qty[dated]
+    if (np.diff(key) < 0).any(): # O agregado já vem ordenado por item/dia; só ordena se não vier
+        order_key = np.argsort(key, kind="stable")
+        key, weights = key[order_key], weights[order_key]
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.zeros(0, dtype=np.int64)
+    per = np.add.reduceat(weights, starts) if len(key) else np.zeros(0)
+    per_item = key[starts] // n_periods
+    mean = np.bincount(per_item, weights=per, minlength=n_items) / n_periods
+    sq = np.bincount(per_item, weights=per ** 2, minlength=n_items) / n_periods
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cv_items = np.where(mean > 0, np.sqrt(np.maximum(sq - mean ** 2, 0)) / mean, np.nan)
+    cv = np.append(cv_items, np.nan)[pos]
+    xyz = np.where(np.isnan(cv), "Z", np.where(cv <= x_cv, "X", np.where(cv <= y_cv, "Y", "Z")))
+
+    result = pd.DataFrame({"item": names.values, "qty": qty, "value": value, "cv": cv}).iloc[order]
+    result["share"] = share
+    result["cum_share"] = np.cumsum(share)
+    result["abc"] = abc
+    result["xyz"] = xyz[order]
+    return result.reset_index(drop=True)
@@ -0,0 +1,117 @@
+import os
+import gzip
+import json
+import shutil
+import hashlib
+from datetime import datetime, timedelta
+
+class BackupStore:
+    """Backups por conteúdo: uma cópia por versão distinta da planilha.
+
+    Cada versão é gravada uma vez em objects/<sha256> (gzip quando compensa)
+    e listada em manifest.json. A retenção mantém tudo do último dia, depois
+    uma por dia (30 dias), uma por semana (12 semanas) e uma por mês.
+    """
+    KEEP_ALL = timedelta(days=1)
+    KEEP_DAILY = timedelta(days=30)
+    KEEP_WEEKLY = timedelta(weeks=12)
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.objects = os.path.join(folder, "objects")
+        self.manifest_path = os.path.join(folder, "manifest.json")
+
+    @classmethod
+    def for_workbook(cls, path):
+        """Pasta backups/<nome da planilha>/ ao lado do arquivo."""
+        base = os.path.splitext(os.path.basename(path))[0]
+        return cls(os.path.join(os.path.dirname(path), "backups", base))
+
+    def versions(self):
+        """Versões do manifesto, mais recente primeiro."""
+        if not os.path.exists(self.manifest_path): return []
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, versions):
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(versions, f, indent=1)
+        os.replace(tmp, self.manifest_path)
+
+    def file_hash(self, path):
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def backup(self, path, now=None):
+        """Registra a versão atual do arquivo; sem cópia nova se o conteúdo já existe."""
+        now = now or datetime.now()
+        os.makedirs(self.objects, exist_ok=True)
+        digest = self.file_hash(path)
+        versions = self.versions()
+        if versions and versions[0]["hash"] == digest: return versions[0]
+
+        obj = self._store_object(path, digest)
+        vid = now.strftime("%Y-%m-%d_%H-%M-%S")
+        taken = {v["id"] for v in versions}
+        n = 1
+        while vid in taken: # Dois saves no mesmo segundo
+            n += 1; vid = f"{now.strftime('%Y-%m-%d_%H-%M-%S')}_{n}"
+        version = {"id": vid, "time": now.isoformat(timespec="seconds"), "hash": digest,
+                   "object": obj, "size": os.path.getsize(path), "ext": os.path.splitext(path)[1]}
+        versions.insert(0, version)
+        self._write_manifest(self._retain(versions, now))
+        self._collect_garbage()
+        return version
+
+    def _store_object(self, path, digest):
+        """Grava o conteúdo compactado; se o gzip não reduzir (xlsx já é zip), guarda cru."""
+        for name in (f"{digest}.gz", digest):
+            if os.path.exists(os.path.join(self.objects, name)): return name
+        gz = os.path.join(self.objects, f"{digest}.gz")
+        with open(path, "rb") as src, gzip.open(f"{gz}.tmp", "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        if os.path.getsize(f"{gz}.tmp") < os.path.getsize(path) * 0.95:
+            os.replace(f"{gz}.tmp", gz)
+            return f"{digest}.gz"
+        os.remove(f"{gz}.tmp")
+        shutil.copyfile(path, os.path.join(self.objects, f"{digest}.tmp"))
+        os.replace(os.path.join(self.objects, f"{digest}.tmp"), os.path.join(self.objects, digest))
+        return digest
+
+    def _retain(self, versions, now):
+        """Aplica a política de retenção (lista já ordenada do mais novo ao mais velho)."""
+        kept, buckets = [], set()
+        for i, v in enumerate(versions):
+            age = now - datetime.fromisoformat(v["time"])
+            t = datetime.fromisoformat(v["time"])
+            if i == 0 or age <= self.KEEP_ALL:
+                kept.append(v); continue
+            if age <= self.KEEP_DAILY: bucket = ("d", t.date())
+            elif age <= self.KEEP_WEEKLY: bucket = ("w",) + tuple(t.isocalendar()[:2])
+            else: bucket = ("m", t.year, t.month)
+            # Fica a mais recente de cada dia/semana/mês
+            if bucket not in buckets:
+                buckets.add(bucket); kept.append(v)
+        return kept
+
+    def _collect_garbage(self):
+        used = {v["object"] for v in self.versions()}
+        for name in os.listdir(self.objects):
+            if name not in used and not name.endswith(".tmp"):
+                os.remove(os.path.join(self.objects, name))
+
+    def restore(self, version_id, dest):
+        """Restaura a versão sobre dest (troca atômica); retorna a versão."""
+        version = next((v for v in self.versions() if v["id"] == version_id), None)
+        if version is None: raise KeyError(f"Backup {version_id} não encontrado")
+        src = os.path.join(self.objects, version["object"])
+        tmp = f"{dest}.restore"
+        opener = gzip.open if version["object"].endswith(".gz") else open
+        with opener(src, "rb") as fin, open(tmp, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+        os.replace(tmp, dest)
+        return version
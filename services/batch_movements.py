@@ -0,0 +1,94 @@
+import csv
+from models.search_engine import normalize_text
+
+OPERATIONS = {"entrada": "Entrada", "saida": "Saida", "baixa": "Saida", "transf": "Transf", "transferencia": "Transf"}
+LOCATIONS = {"canoas": "Canoas", "pf": "Passo Fundo", "passo fundo": "Passo Fundo"}
+DIRECTIONS = {"canoas -> pf": "Canoas -> PF", "canoas": "Canoas -> PF", "pf -> canoas": "PF -> Canoas", "pf": "PF -> Canoas", "passo fundo": "PF -> Canoas"}
+# Cabeçalhos aceitos (sem acento, minúsculas) para cada campo do CSV
+HEADERS = {"item": ("item", "id", "codigo", "produto", "nome"), "operation": ("operacao", "op", "tipo"),
+           "qty": ("quantidade", "qtd", "qtde"), "location": ("local", "origem", "direcao")}
+
+class BatchError(ValueError):
+    """Lote recusado inteiro (nada foi aplicado); `errors` = [(linha, mensagem)]."""
+    def __init__(self, errors):
+        self.errors = errors
+        lines = [f"Linha {line}: {msg}" if line else msg for line, msg in errors[:15]]
+        if len(errors) > 15: lines.append(f"... e mais {len(errors) - 15} erros")
+        super().__init__("\n".join(lines))
+
+def movement(item, operation, qty, location, line=None):
+    """Valida e normaliza uma movimentação; `location` é o local (Entrada/Saida) ou a direção (Transf)."""
+    op = OPERATIONS.get(normalize_text(operation).strip())
+    if op is None: raise ValueError(f"Operação desconhecida: {operation}")
+    try: qty = float(str(qty).strip().replace(",", "."))
+    except ValueError: raise ValueError(f"Quantidade inválida: {qty}")
+    if qty <= 0 or not qty.is_integer(): raise ValueError(f"Quantidade inválida: {qty:g}")
+    place = normalize_text(location or "").strip()
+    if op == "Transf":
+        direction = DIRECTIONS.get(" ".join(place.replace("->", " -> ").split()))
+        if direction is None: raise ValueError(f"Direção de transferência inválida: {location}")
+        return {"line": line, "item": str(item).strip(), "operation": op, "qty": int(qty), "location": None, "direction": direction}
+    place = LOCATIONS.get(place)
+    if place is None: raise ValueError(f"Local inválido: {location}")
+    return {"line": line, "item": str(item).strip(), "operation": op, "qty": int(qty), "location": place, "direction": None}
+
+def read_movements_csv(path):
+    """Movimentações de um CSV (contagem, nota de fornecedor) com cabeçalho item;operacao;quantidade;local.
+
+    Aceita ';' ou ',' e os sinônimos de HEADERS. Retorna (movimentações,
+    erros [(linha, mensagem)]); linhas em branco são puladas.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        sample = f.read(4096); f.seek(0)
+        try: dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error: dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        header = [normalize_text(h).strip() for h in next(reader, [])]
+        cols = {}
+        for field, names in HEADERS.items():
+            found = [pos for pos, h in enumerate(header) if h in names]
+            if not found: return [], [(1, f"Coluna '{names[0]}' não encontrada no cabeçalho")]
+            cols[field] = found[0]
+        moves, errors = [], []
+        for line, values in enumerate(reader, start=2):
+            if not any(v.strip() for v in values): continue
+            try:
+                get = lambda field: values[cols[field]] if cols[field] < len(values) else ""
+                if not get("item").strip(): raise ValueError("Item em branco")
+                moves.append(movement(get("item"), get("operation"), get("qty"), get("location"), line))
+            except ValueError as e:
+                errors.append((line, str(e)))
+    return moves, errors
+
+class ScannerSession:
+    """Leituras de um leitor de código de barras (um bipe = 1 unidade) para aplicar como lote.
+
+    Todas as leituras têm a mesma operação e local; bipes repetidos do mesmo
+    código somam na primeira linha dele, na ordem em que apareceram.
+    """
+    def __init__(self, operation, location):
+        movement("-", operation, 1, location) # Valida operação/local já na abertura
+        self.operation = operation
+        self.location = location
+        self.counts = {} # código -> quantidade (ordem da primeira leitura)
+        self._scans = [] # Para desfazer a última leitura
+
+    def scan(self, code, qty=1):
+        code = str(code).strip()
+        if not code: return
+        self.counts[code] = self.counts.get(code, 0) + qty
+        self._scans.append((code, qty))
+
+    def undo(self):
+        """Desfaz a última leitura; retorna o código ou None."""
+        if not self._scans: return None
+        code, qty = self._scans.pop()
+        self.counts[code] -= qty
+        if self.counts[code] <= 0: del self.counts[code]
+        return code
+
+    def __len__(self):
+        return len(self._scans)
+
+    def movements(self):
+        return [movement(code, self.operation, qty, self.location, n) for n, (code, qty) in enumerate(self.counts.items(), start=1)]
@@ -0,0 +1,116 @@
+import io
+import os
+import csv
+import hashlib
+import numpy as np
+import pandas as pd
+
+SEP = b"\x1f"
+
+COLUMNS = ["ts", "date", "op", "item", "qty", "detail"]
+
+def to_br_date(ts):
+    """'aaaa-mm-dd HH:MM:SS' -> 'dd/mm/aaaa HH:MM:SS' (formato da tela)."""
+    return f"{ts[8:10]}/{ts[5:7]}/{ts[0:4]}{ts[10:]}" if len(ts) >= 10 and ts[4] == "-" else ts
+
+def _empty_frame():
+    return pd.DataFrame({"ts": pd.Series(dtype=object), "date": pd.Series(dtype="datetime64[us]"),
+                         "op": pd.Series(dtype="category"), "item": pd.Series(dtype="category"),
+                         "qty": pd.Series(dtype="int64"), "detail": pd.Series(dtype=object)}, columns=COLUMNS)
+
+def _stripped(col):
+    """Categoria com os valores sem espaços nas pontas (strip só nos distintos)."""
+    cats = col.cat.categories.str.strip()
+    if cats.is_unique: return pd.Categorical.from_codes(col.cat.codes.values, cats)
+    return pd.Categorical(np.asarray(cats, dtype=object)[col.cat.codes.values])
+
+def _unify_separators(data, fast):
+    """Troca ';;;' (ou o legado ' | ') pelo byte SEP, linha a linha só quando precisa."""
+    if fast and b" | " not in data: return data.replace(b";;;", SEP)
+    if fast and b";;;" not in data: return data.replace(b" | ", SEP)
+    # Formatos misturados: decide por linha e para no 5º campo (o resto fica no detalhe)
+    return b"\n".join(line.replace(b";;;", SEP, 4) if b";;;" in line else line.replace(b" | ", SEP, 4)
+                      for line in data.split(b"\n"))
+
+def _read_fields(data):
+    return pd.read_csv(io.BytesIO(data), sep="\x1f", header=None, names=["raw", "op", "item", "qty", "detail"],
+                       dtype={"raw": object, "op": "category", "item": "category", "qty": "category", "detail": object},
+                       quoting=csv.QUOTE_NONE, na_filter=False, skipinitialspace=True, skip_blank_lines=True,
+                       encoding="utf-8", encoding_errors="replace", engine="c")
+
+def _quantities(col):
+    """Quantidades como int64; texto inválido vira 0. Converte só os valores distintos."""
+    values = pd.to_numeric(pd.Series(col.cat.categories), errors="coerce").fillna(0).astype("int64").values
+    return values[col.cat.codes.values]
+
+def parse_history_bytes(data):
+    """Bloco de linhas completas (bytes, ';;;' ou legado ' | ') -> DataFrame tipado.
+
+    Colunas: ts (texto 'aaaa-mm-dd HH:MM:SS', ordenável), date (datetime),
+    op e item (categorias), qty (int64) e detail. Os separadores viram um
+    único byte e o motor C do pandas faz o resto; linhas com menos de
+    quatro campos são descartadas.
+    """
+    try:
+        df = _read_fields(_unify_separators(data, fast=True))
+    except pd.errors.ParserError: # Alguma linha com mais de 5 campos
+        df = _read_fields(_unify_separators(data, fast=False))
+    df = df[df["qty"] != ""] # Menos de 4 campos
+    if df.empty: return _empty_frame()
+
+    raw = df["raw"]
+    date = pd.to_datetime(raw, format="%d/%m/%Y %H:%M:%S", errors="coerce")
+    legacy_iso = date.isna()
+    if legacy_iso.any(): date[legacy_iso] = pd.to_datetime(raw[legacy_iso], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    ts = np.char.replace(np.datetime_as_string(date.values, unit="s"), "T", " ").astype(object)
+    ts = np.where(date.isna().values, raw.values, ts) # Data fora do padrão: mantém o texto
+
+    return pd.DataFrame({
+        "ts": ts,
+        "date": date.values,
+        "op": _stripped(df["op"]),
+        "item": _stripped(df["item"]),
+        "qty": _quantities(df["qty"]),
+        "detail": df["detail"].values,
+    }, columns=COLUMNS).reset_index(drop=True)
+
+def parse_history_lines(lines):
+    """Mesmo que parse_history_bytes, para uma lista de linhas em texto."""
+    return parse_history_bytes("\n".join(line.rstrip("\r\n") for line in lines).encode("utf-8"))
+
+def iter_history_frames(path, offset=0, block_size=8 * 1024 * 1024):
+    """Lê o histórico a partir de `offset` em blocos de ~block_size bytes.
+
+    Gera (DataFrame do bloco, offset após o bloco). Só entram linhas
+    completas: uma última linha sem '\\n' (ainda sendo escrita) fica de fora
+    e o offset para antes dela.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        tail = b""
+        while True:
+            block = f.read(block_size)
+            if not block: return
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            tail = block[cut:]
+            if not cut: continue
+            offset += cut
+            yield parse_history_bytes(block[:cut]), offset
+
+def history_head(path, offset):
+    """Hash dos primeiros bytes já lidos (até 4096): muda se o arquivo foi trocado."""
+    with open(path, "rb") as f: return hashlib.sha1(f.read(min(offset, 4096))).hexdigest()
+
+def resume_offset(path, offset, head):
+    """Offset de onde continuar a leitura incremental: 0 se o histórico foi truncado ou rotacionado."""
+    if offset > os.path.getsize(path) or (offset and head != history_head(path, offset)): return 0
+    return offset
+
+def read_history(path, offset=0):
+    """Histórico inteiro (ou a partir de `offset`) num único DataFrame."""
+    frames = [frame for frame, _ in iter_history_frames(path, offset)]
+    if not frames: return _empty_frame()
+    df = pd.concat(frames, ignore_index=True)
+    for col in ("op", "item"): df[col] = df[col].astype("category") # Blocos com categorias diferentes viram object
+    return df
@@ -0,0 +1,34 @@
+import os
+from services.history_parser import parse_history_lines, to_br_date
+
+def iter_lines_reversed(path, block_size=64 * 1024):
+    """Linhas do arquivo da última para a primeira, lendo blocos a partir do fim.
+
+    Só lê o que for consumido: pegar as 200 linhas mais novas custa o mesmo
+    com 1 mil ou 5 milhões de linhas.
+    """
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        tail = b""
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step) + tail
+            lines = block.split(b"\n")
+            tail = lines.pop(0) # Pode estar cortada: junta com o próximo bloco
+            for raw in reversed(lines):
+                if raw.strip(): yield raw.decode("utf-8", errors="replace")
+        if tail.strip(): yield tail.decode("utf-8", errors="replace")
+
+def iter_pages_reversed(path, page_size=200):
+    """Páginas de (data, op, item, qtd, detalhe), mais recente primeiro."""
+    lines = iter_lines_reversed(path)
+    while True:
+        batch = [line for _, line in zip(range(page_size), lines)]
+        if not batch: return
+        # Cada página é analisada de uma vez; linhas inválidas somem do bloco
+        frame = parse_history_lines(batch)
+        if len(frame):
+            yield [(to_br_date(ts), op, item, qty, detail) for ts, op, item, qty, detail in
+                   zip(frame["ts"], frame["op"].astype(str), frame["item"].astype(str), frame["qty"].tolist(), frame["detail"])]
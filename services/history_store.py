@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import threading
+from services.history_parser import iter_history_frames, history_head, resume_offset, to_br_date
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movements (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,          -- 'AAAA-MM-DD HH:MM:SS' (ordenável)
+    op TEXT NOT NULL,
+    item TEXT NOT NULL,
+    qty INTEGER NOT NULL,
+    detail TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_mov_ts ON movements(ts, id);
+CREATE INDEX IF NOT EXISTS idx_mov_item ON movements(item, ts);
+CREATE INDEX IF NOT EXISTS idx_mov_op ON movements(op, ts);
+"""
+
+_sync_locks = {} # Caminho do .db -> Lock: uma importação por vez (janelas de histórico simultâneas)
+_sync_locks_guard = threading.Lock()
+
+def _sync_lock(db_path):
+    with _sync_locks_guard:
+        return _sync_locks.setdefault(os.path.normcase(os.path.abspath(db_path)), threading.Lock())
+
+class HistoryStore:
+    """Histórico de movimentações em SQLite, com índices por data, item e operação.
+
+    O arquivo <planilha>_historico.txt continua sendo a fonte: sync()
+    importa só o que foi anexado desde a última vez (offset em bytes) e
+    reimporta tudo se o .txt foi truncado ou trocado.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as con: con.executescript(SCHEMA + INDEXES)
+
+    @classmethod
+    def for_history(cls, history_path):
+        return cls(f"{os.path.splitext(history_path)[0]}.db")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def sync(self, history_path, progress=None):
+        """Importa as linhas novas do .txt; retorna quantas entraram."""
+        if not os.path.exists(history_path): return 0
+        # Outra sync em andamento: espera e relê o offset que ela gravou
+        with _sync_lock(self.db_path):
+            return self._sync(history_path, progress)
+
+    def _sync(self, history_path, progress):
+        size = os.path.getsize(history_path)
+        with self._connect() as con:
+            meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+            offset = resume_offset(history_path, int(meta.get("offset", 0)), meta.get("head"))
+            if offset == 0: con.execute("DELETE FROM movements") # Primeira vez ou arquivo truncado/rotacionado
+            if offset == size: return 0
+            if offset == 0:
+                # Importação completa: índices recriados no fim saem bem mais baratos
+                for name in ("idx_mov_ts", "idx_mov_item", "idx_mov_op"): con.execute(f"DROP INDEX IF EXISTS {name}")
+
+            added = 0
+            for frame, offset in iter_history_frames(history_path, offset):
+                rows = zip(frame["ts"].tolist(), frame["op"].astype(str).tolist(), frame["item"].astype(str).tolist(),
+                           frame["qty"].tolist(), frame["detail"].tolist())
+                con.executemany("INSERT INTO movements(ts, op, item, qty, detail) VALUES (?,?,?,?,?)", rows)
+                added += len(frame)
+                if progress: progress(offset, size)
+            for stmt in INDEXES.strip().splitlines(): con.execute(stmt)
+            con.executemany("INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)",
+                            [("offset", str(offset)), ("head", history_head(history_path, offset))])
+        return added
+
+    def _where(self, item=None, op=None, date_from=None, date_to=None):
+        clauses, args = [], []
+        if item: clauses.append("item LIKE ?"); args.append(f"%{item}%")
+        if op: clauses.append("op = ?"); args.append(op)
+        if date_from: clauses.append("ts >= ?"); args.append(date_from)
+        if date_to: clauses.append("ts < ?"); args.append(date_to)
+        return clauses, args
+
+    def iter_pages(self, page_size=200, **filters):
+        """Páginas (mais recente primeiro) via paginação por chave (ts, id), sem OFFSET."""
+        last = None
+        while True:
+            clauses, args = self._where(**filters)
+            if last:
+                clauses.append("(ts, id) < (?, ?)"); args.extend(last)
+            sql = "SELECT id, ts, op, item, qty, detail FROM movements"
+            if clauses: sql += " WHERE " + " AND ".join(clauses)
+            sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+            with self._connect() as con:
+                rows = con.execute(sql, args + [page_size]).fetchall()
+            if not rows: return
+            last = (rows[-1][1], rows[-1][0])
+            yield [(to_br_date(ts), op, item, qty, detail) for _, ts, op, item, qty, detail in rows]
+            if len(rows) < page_size: return
+
+    def operations(self):
+        with self._connect() as con:
+            return [r[0] for r in con.execute("SELECT DISTINCT op FROM movements ORDER BY op")]
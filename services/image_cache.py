@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+class ImageCache:
+    """Cache LRU de imagens já prontas para a tela, limitado em bytes.
+
+    O custo de cada entrada é largura x altura x 4 (RGBA descomprimido);
+    ao passar de `max_bytes` saem as menos usadas recentemente. `in` não
+    mexe na ordem nem nos contadores; get() sim.
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict() # chave -> (imagem, bytes)
+
+    @staticmethod
+    def image_bytes(size):
+        w, h = size
+        return w * h * 4
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        entry = self._items.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, image, size):
+        """Guarda `image` com o custo de uma imagem `size` (largura, altura)."""
+        self.discard(key)
+        nbytes = self.image_bytes(size)
+        self._items[key] = (image, nbytes)
+        self.bytes += nbytes
+        while self.bytes > self.max_bytes and len(self._items) > 1:
+            _, (_, old) = self._items.popitem(last=False)
+            self.bytes -= old
+            self.evictions += 1
+
+    def discard(self, key):
+        """Invalida a entrada (foto trocada/removida); não reclama se não existir."""
+        entry = self._items.pop(key, None)
+        if entry: self.bytes -= entry[1]
+
+    def clear(self):
+        self._items.clear()
+        self.bytes = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"items": len(self._items), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0}
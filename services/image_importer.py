@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image, ImageOps
+
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+
+def normalize_image(src, dest, max_side=1200, quality=85):
+    """Reduz a foto para no máximo max_side px e regrava como JPEG (roda em outro processo)."""
+    with Image.open(src) as img:
+        img.draft("RGB", (max_side, max_side)) # JPEG grande: decodifica já reduzido
+        img = ImageOps.exif_transpose(img) # Foto de celular "deitada"
+        img.thumbnail((max_side, max_side))
+        if img.mode in ("RGBA", "LA", "P"):
+            # Fundo branco no lugar da transparência (JPEG não tem alfa)
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.split()[3])
+        else:
+            img = img.convert("RGB")
+        img.save(dest, format="JPEG", quality=quality, optimize=True)
+    return os.path.getsize(dest)
+
+def plan_import(folder, product_names, img_mgr):
+    """Casa os arquivos da pasta com produtos pelo nome limpo.
+
+    Retorna (pares [(arquivo, produto)], não casados, repetidos): um
+    arquivo não casa se nenhum produto tem o mesmo clean_filename
+    (ignorando maiúsculas); um segundo arquivo para o mesmo produto é
+    'repetido'.
+    """
+    products = {}
+    for name in product_names:
+        key = img_mgr.clean_filename(name).lower()
+        if key: products.setdefault(key, str(name))
+
+    matched, unmatched, duplicated, taken = [], [], [], set()
+    with os.scandir(folder) as entries:
+        files = sorted((e.name, e.path) for e in entries if e.is_file())
+    for name, path in files:
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in SOURCE_EXTENSIONS: continue
+        product = products.get(img_mgr.clean_filename(stem).lower())
+        if product is None: unmatched.append(name)
+        elif product in taken: duplicated.append(name)
+        else:
+            taken.add(product)
+            matched.append((path, product))
+    return matched, unmatched, duplicated
+
+class BulkImageImport:
+    """Importação em lote de fotos, com a conversão num pool de processos.
+
+    Cada foto casada é reduzida/recomprimida por normalize_image para um
+    arquivo temporário na pasta de imagens e depois instalada pelo
+    ImageManager (que troca a foto antiga e atualiza o índice). Ao final
+    grava um relatório dos arquivos não importados na pasta de origem.
+    Mesma interface de acompanhamento do ReportJob: progress, cancel(), poll().
+    """
+    def __init__(self, img_mgr, folder, product_names, max_side=1200, quality=85, workers=None):
+        self.img_mgr = img_mgr
+        self.folder = folder
+        self.product_names = list(product_names)
+        self.max_side = max_side
+        self.quality = quality
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.progress = (0, 0)
+        self.imported = []
+        self._cancel = threading.Event()
+        self._results = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        try:
+            matched, unmatched, duplicated = plan_import(self.folder, self.product_names, self.img_mgr)
+            self.progress = (0, len(matched))
+            failed = self._convert(matched)
+            report = self._write_report(matched, unmatched, duplicated, failed)
+            status = "cancelled" if self._cancel.is_set() else "ok"
+            self._results.put((status, {"imported": len(self.imported), "unmatched": len(unmatched),
+                                        "duplicated": len(duplicated), "failed": len(failed), "report": report}))
+        except Exception as e:
+            self._results.put(("error", str(e)))
+
+    def _convert(self, matched):
+        failed, done = [], 0
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            for n, (src, product) in enumerate(matched):
+                tmp = os.path.join(self.img_mgr.img_folder, f".importando_{os.getpid()}_{n}.tmp")
+                futures[pool.submit(normalize_image, src, tmp, self.max_side, self.quality)] = (src, product, tmp)
+            for future in as_completed(futures):
+                src, product, tmp = futures[future]
+                try:
+                    future.result()
+                    self.img_mgr.install_image(tmp, product, ".jpg")
+                    self.imported.append(product)
+                except Exception as e:
+                    failed.append((os.path.basename(src), str(e)))
+                    if os.path.exists(tmp): os.remove(tmp)
+                done += 1
+                self.progress = (done, len(matched))
+                if self._cancel.is_set():
+                    for f in futures: f.cancel()
+                    break
+        for _, _, tmp in futures.values(): # Cancelados no meio do caminho
+            if os.path.exists(tmp): os.remove(tmp)
+        return failed
+
+    def _write_report(self, matched, unmatched, duplicated, failed):
+        if not (unmatched or duplicated or failed): return None
+        path = os.path.join(self.folder, f"importacao_fotos_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"Importadas: {len(self.imported)} de {len(matched)} casadas\n")
+            if unmatched:
+                f.write(f"\nSem produto com esse nome ({len(unmatched)}):\n")
+                f.writelines(f"  {name}\n" for name in unmatched)
+            if duplicated:
+                f.write(f"\nMais de uma foto para o mesmo produto, ignoradas ({len(duplicated)}):\n")
+                f.writelines(f"  {name}\n" for name in duplicated)
+            if failed:
+                f.write(f"\nFalharam na conversão ({len(failed)}):\n")
+                f.writelines(f"  {name}: {err}\n" for name, err in failed)
+        return path
+
+    def cancel(self):
+        self._cancel.set()
+
+    def poll(self):
+        """None enquanto roda; depois ('ok'|'cancelled', resumo) ou ('error', mensagem)."""
+        try: return self._results.get_nowait()
+        except queue.Empty: return None
@@ -1,13 +1,25 @@
 import os
 import sys
 import re
+import time
 import shutil
+import threading
+
+EXTENSIONS = [".jpg", ".png", ".jpeg"] # Ordem de preferência quando há mais de uma
 
 class ImageManager:
+    REFRESH_INTERVAL = 2.0 # Segundos entre conferências do mtime da pasta
+
     def __init__(self):
         """Inicializa o gerenciador fixando o caminho base."""
         self.base_dir = self._calculate_base_path()
         self.img_folder = self.get_image_folder()
+        # Índice da pasta: nome limpo (minúsculo) -> {extensão: caminho}
+        self._index = {}
+        self._index_mtime = None
+        self._checked_at = 0.0
+        # A importação em lote instala fotos numa thread enquanto a UI consulta o índice
+        self._lock = threading.RLock()
 
     def _calculate_base_path(self):
         """Determina a raiz do projeto de forma absoluta."""
@@ -31,40 +43,102 @@ class ImageManager:
         clean = re.sub(r'[\\/*?:"<>|]', "", str(name)).strip()
         return clean
 
+    # --- ÍNDICE DA PASTA ---
+    def _key(self, product_name):
+        return self.clean_filename(product_name).lower() # Windows não diferencia maiúsculas
+
+    def _scan(self):
+        """Lê a pasta numa única passada de os.scandir."""
+        index = {}
+        with os.scandir(self.img_folder) as entries:
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                ext = ext.lower()
+                if ext in EXTENSIONS and entry.is_file():
+                    index.setdefault(stem.lower(), {})[ext] = entry.path
+        self._index = index
+
+    def refresh(self, force=False):
+        """Relê a pasta se o mtime dela mudou (no máximo uma conferência a cada REFRESH_INTERVAL)."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.REFRESH_INTERVAL: return
+            self._checked_at = now
+            mtime = os.stat(self.img_folder).st_mtime_ns
+            if force or mtime != self._index_mtime:
+                self._scan()
+                self._index_mtime = mtime
+
+    def _touch_index(self):
+        """Após uma alteração nossa: o índice já está certo, só acompanha o novo mtime."""
+        try: self._index_mtime = os.stat(self.img_folder).st_mtime_ns
+        except OSError: self._index_mtime = None
+
+    def has_image(self, product_name):
+        if not product_name: return False
+        with self._lock:
+            self.refresh()
+            return self._key(product_name) in self._index
+
+    def products_with_images(self, product_names):
+        """Para cada nome, se existe foto (uma consulta ao dicionário por item)."""
+        with self._lock:
+            self.refresh()
+            index, key = self._index, self._key
+            return [bool(name) and key(name) in index for name in product_names]
+
     def find_image_path(self, product_name):
-        """Procura a imagem no disco."""
+        """Procura a imagem no índice da pasta."""
         if not product_name: return None
-        safe_name = self.clean_filename(product_name)
-        
-        for ext in [".jpg", ".png", ".jpeg"]:
-            file_path = os.path.join(self.img_folder, f"{safe_name}{ext}")
-            if os.path.exists(file_path):
-                return file_path
-        return None
+        with self._lock:
+            self.refresh()
+            files = self._index.get(self._key(product_name))
+            if not files: return None
+            return next(files[ext] for ext in EXTENSIONS if ext in files)
 
     def save_image(self, source_path, product_name):
         """Salva a imagem permanentemente no HD."""
         if not source_path or not product_name: return None
         safe_name = self.clean_filename(product_name)
         
-        # Remove antigas antes de salvar a nova
-        self.delete_image(product_name)
+        with self._lock:
+            # Remove antigas antes de salvar a nova
+            self.delete_image(product_name)
 
-        extension = os.path.splitext(source_path)[1].lower()
-        destination = os.path.join(self.img_folder, f"{safe_name}{extension}")
-        shutil.copy2(source_path, destination)
-        return destination
+            extension = os.path.splitext(source_path)[1].lower()
+            destination = os.path.join(self.img_folder, f"{safe_name}{extension}")
+            shutil.copy2(source_path, destination)
+            if extension in EXTENSIONS:
+                self._index.setdefault(safe_name.lower(), {})[extension] = destination
+            self._touch_index()
+            return destination
+
+    def install_image(self, prepared_path, product_name, extension):
+        """Move um arquivo já pronto (ex.: importação em lote) para ser a foto do produto."""
+        safe_name = self.clean_filename(product_name)
+        with self._lock:
+            self.delete_image(product_name)
+            destination = os.path.join(self.img_folder, f"{safe_name}{extension}")
+            os.replace(prepared_path, destination)
+            self._index.setdefault(safe_name.lower(), {})[extension] = destination
+            self._touch_index()
+            return destination
 
     def delete_image(self, product_name):
         """Remove fisicamente o arquivo de imagem do disco."""
-        safe_name = self.clean_filename(product_name)
-        removido = False
-        for ext in [".jpg", ".png", ".jpeg"]:
-            file_path = os.path.join(self.img_folder, f"{safe_name}{ext}")
-            if os.path.exists(file_path):
+        with self._lock:
+            self.refresh()
+            files = self._index.get(self._key(product_name), {})
+            removido = False
+            for ext, file_path in list(files.items()):
                 try:
                     os.remove(file_path)
+                    del files[ext]
                     removido = True
+                except FileNotFoundError:
+                    del files[ext] # Já não existia: o índice estava atrasado
                 except Exception as e:
                     print(f"Erro ao deletar arquivo: {e}")
-        return removido
\ No newline at end of file
+            if not files: self._index.pop(self._key(product_name), None)
+            self._touch_index()
+            return removido
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import threading
+
+class MovementJournal:
+    """Journal de movimentações (write-ahead), uma linha JSON por operação.
+
+    A primeira linha guarda a assinatura (tamanho, mtime) da planilha sobre a
+    qual as entradas se aplicam. append() só escreve no buffer; uma thread faz
+    o fsync em grupo a cada `commit_interval`, então cada movimento é barato
+    e fica no disco em poucos milissegundos. Cada entrada leva um `seq`
+    crescente; o marcador (<journal>.mark) diz até qual seq uma planilha
+    gravada já chegou, para o replay não repetir o que ela contém.
+    """
+    def __init__(self, path, commit_interval=0.05):
+        self.path = path
+        self.commit_interval = commit_interval
+        self.count = 0 # Entradas desde o cabeçalho
+        self.seq = 0 # seq da última entrada
+        self.base = None # Assinatura da planilha no cabeçalho
+        self.marker_path = f"{path}.mark"
+        self._lock = threading.Condition()
+        self._file = None
+        self._dirty = False
+        self._thread = None
+
+    def read(self):
+        """(cabeçalho, entradas); uma última linha incompleta (queda de energia) é ignorada."""
+        if not os.path.exists(self.path): return None, []
+        header, entries = None, []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f):
+                try: data = json.loads(line)
+                except ValueError: break
+                if n == 0: header = data
+                else: entries.append(data)
+        for n, entry in enumerate(entries, start=1): entry.setdefault("seq", n) # Journal de antes do seq
+        return header, entries
+
+    def open(self, signature, entries=()):
+        """Recria o journal sobre a planilha `signature`, mantendo `entries`."""
+        with self._lock:
+            self._close_file()
+            tmp = f"{self.path}.tmp"
+            self.base = list(signature) if signature else None
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"base": self.base}) + "\n")
+                for entry in entries: f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush(); os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.count = len(entries)
+            if entries: self.seq = max(self.seq, entries[-1]["seq"])
+
+    def resume(self, header, entries):
+        """Continua anexando a um journal existente (após o replay)."""
+        with self._lock:
+            self._close_file()
+            self._file = open(self.path, "a", encoding="utf-8")
+            self.base = header.get("base")
+            self.count = len(entries)
+            if entries: self.seq = max(self.seq, entries[-1]["seq"])
+
+    def append(self, entry):
+        with self._lock:
+            if self._file is None: return
+            self.seq += 1
+            entry["seq"] = self.seq
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.count += 1
+            self._dirty = True
+            self._lock.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._dirty: self._lock.wait()
+            time.sleep(self.commit_interval) # Junta as entradas que chegarem (group commit)
+            self.flush()
+
+    def flush(self):
+        """Garante no disco tudo o que já foi anexado."""
+        with self._lock:
+            if self._file is None or not self._dirty: return
+            self._file.flush()
+            fd = self._file.fileno()
+            self._dirty = False
+        try: os.fsync(fd) # Fora do lock: append não espera o disco
+        except OSError: pass # Arquivo trocado por open()/checkpoint, que já fazem fsync
+
+    def checkpoint(self, signature, mark):
+        """Planilha gravada até o seq `mark`: descarta essas entradas e troca a base."""
+        with self._lock:
+            if self._file: self._file.flush()
+            _, entries = self.read()
+            self.open(signature, [e for e in entries if e["seq"] > mark])
+            try: os.remove(self.marker_path)
+            except OSError: pass
+
+    def write_marker(self, base, saved, mark, history=False):
+        """Grava (fsync) que a planilha `saved` já contém as entradas até `mark` do journal sobre `base`."""
+        tmp = f"{self.marker_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"base": base, "saved": list(saved), "seq": mark, "history": history}, f)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, self.marker_path)
+
+    def read_marker(self):
+        try:
+            with open(self.marker_path, "r", encoding="utf-8") as f: return json.load(f)
+        except (OSError, ValueError): return None
+
+    def close(self):
+        self.flush()
+        with self._lock: self._close_file()
+
+    def _close_file(self):
+        if self._file:
+            self._file.flush(); os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+            self._dirty = False
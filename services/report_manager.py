@@ -1,82 +1,150 @@
 import os
+import numpy as np
+import pandas as pd
 from datetime import datetime
 from tkinter import filedialog
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Flowable
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
+from services.abc_aggregate import OutflowAggregate
+from services.abc_analysis import abc_xyz, price_column
 
 class ReportManager:
-    def generate_abc(self, df, history_path):
+    CHUNK_ROWS = 500
+
+    def generate_abc(self, df, history_path, days=None, location=None):
         if not history_path or not os.path.exists(history_path):
             raise FileNotFoundError("Histórico não encontrado.")
 
-        # 1. Processar Histórico
-        counts = {}
-        with open(history_path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    # Suporte legacy (|) e novo (;;;)
-                    parts = line.split(";;;")
-                    if len(parts) < 5: parts = line.split(" | ")
-                    
-                    if len(parts) >= 4:
-                        op = parts[1].strip()
-                        if "SAIDA" in op or "BAIXA" in op:
-                            item = parts[2].strip()
-                            qty = int(parts[3])
-                            counts[item] = counts.get(item, 0) + qty
-                except: continue
-
-        # 2. Ranking
-        ranking = []
-        all_items = df.iloc[:, 1].tolist()
-        
-        for item in all_items:
-            out_qty = counts.get(str(item), 0)
-            cls = "C (Sem Giro)"
-            if out_qty > 50: cls = "A (Alto Giro)"
-            elif out_qty > 10: cls = "B (Médio Giro)"
-            ranking.append([str(item), out_qty, cls])
-        
-        ranking.sort(key=lambda x: x[1], reverse=True)
-        return [["Produto", "Saídas", "Classificação"]] + ranking
-
-    def generate_stock_list(self, df):
+        # 1. Saídas por item/dia/local (agregado incremental: só lê linhas novas)
+        daily = OutflowAggregate(history_path).update()
+
+        # 2. Pareto ABC + XYZ na janela/local escolhidos
+        res = abc_xyz(df, daily, days=days, location=location)
+        by_value = price_column(df) is not None
+        header = ["Produto", "Saídas"] + (["Valor"] if by_value else []) + ["% Acum.", "ABC", "XYZ"]
+        cols = [res["item"], res["qty"].astype(str)]
+        if by_value: cols.append(res["value"].map("{:,.2f}".format))
+        cols += [(res["cum_share"] * 100).map("{:.1f}%".format), res["abc"], res["xyz"]]
+        return [header] + [list(row) for row in zip(*cols)]
+
+    STOCK_SORTS = {"id": "ID", "name": "Nome", "total": "Maior saldo", "canoas": "Saldo Canoas", "pf": "Saldo PF"}
+    STOCK_GROUPS = {None: "Sem agrupamento", "location": "Por local", "level": "Por nível de estoque"}
+    LEVELS = [(1, 5, "Baixo (1-5)"), (6, 20, "Médio (6-20)"), (21, None, "Alto (21+)")]
+
+    def generate_stock_list(self, df, sort="id", group=None):
+        """Itens com saldo em algum local, ordenados por STOCK_SORTS e agrupados por STOCK_GROUPS."""
+        c = pd.to_numeric(df.iloc[:, 2], errors="coerce").fillna(0).astype("int64").values
+        pf = pd.to_numeric(df.iloc[:, 3], errors="coerce").fillna(0).astype("int64").values
+        keep = np.flatnonzero((c > 0) | (pf > 0))
+        c, pf = c[keep], pf[keep]
+        names = np.asarray(df.iloc[keep, 1].astype(str), dtype=object)
+        total = c + pf
+
+        if sort == "name": sort_key = pd.Series(names).str.lower().values
+        else: sort_key = {"id": keep, "total": -total, "canoas": -c, "pf": -pf}[sort]
+        if group == "location":
+            labels = np.array(["Só Canoas", "Só PF", "Canoas e PF"])
+            gkey = np.where(pf == 0, 0, np.where(c == 0, 1, 2))
+        elif group == "level":
+            labels = np.array([label for _, _, label in self.LEVELS])
+            # Saldo total <= 0 (um local negativo após correção) cai na faixa mais baixa
+            gkey = np.clip(np.searchsorted([lo for lo, _, _ in self.LEVELS], total, side="right") - 1, 0, None)
+        else:
+            labels, gkey = None, np.zeros(len(keep), dtype=np.int64)
+        order = np.lexsort((keep, sort_key, gkey)) # Último é a chave principal; ID desempata
+
+        cols = [(keep[order] + 2).astype(str), names[order], c[order].astype(str), pf[order].astype(str)]
+        rows = [list(row) for row in zip(*(col.tolist() for col in cols))]
         data = [["ID", "Produto", "Canoas", "PF"]]
-        for idx, row in df.iterrows():
-            c, pf = int(row.iloc[2]), int(row.iloc[3])
-            if c > 0 or pf > 0:
-                data.append([str(idx+2), str(row.iloc[1]), str(c), str(pf)])
+        if labels is None: return data + rows
+
+        gsorted = gkey[order]
+        bounds = np.flatnonzero(np.r_[True, gsorted[1:] != gsorted[:-1], True]) if len(gsorted) else [0]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            n = end - start
+            data.append(["", f"{labels[gsorted[start]]} - {n} {'item' if n == 1 else 'itens'}", "", ""])
+            data.extend(rows[start:end])
         return data
 
+    def ask_pdf_path(self, filename):
+        """Diálogo de destino (thread da UI); None se o usuário cancelar."""
+        return filedialog.asksaveasfilename(defaultextension=".pdf", initialfile=filename) or None
+
+    def open_pdf(self, path):
+        os.startfile(path)
+
     def save_pdf(self, title, data, filename):
-        path = filedialog.asksaveasfilename(defaultextension=".pdf", initialfile=filename)
+        """Fluxo síncrono completo: escolhe o arquivo, gera e abre."""
+        path = self.ask_pdf_path(filename)
         # CORREÇÃO: Retorna False se o usuário cancelar
         if not path: return False
-        
+        self.build_pdf(path, title, data)
+        self.open_pdf(path)
+        return True
+
+    def build_pdf(self, path, title, data, progress=None, cancel=None):
+        """Monta o PDF em blocos de CHUNK_ROWS sem interface (pode rodar em outra thread); cancel -> ReportCancelled."""
+        header, rows = data[0], data[1:]
+        tmp = f"{path}.tmp"
+        doc = _ProgressDoc(tmp, pagesize=A4, progress=progress, cancel=cancel, total=len(rows))
+        styles = getSampleStyleSheet()
+        elements = [Paragraph(title, styles['Title']),
+                    Paragraph(f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']),
+                    Spacer(1, 20)]
+
+        widths = self._col_widths(data, doc.width)
+        style = TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.darkblue),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+            ('GRID', (0,0), (-1,-1), 1, colors.black),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('FONTSIZE', (0,0), (-1,-1), 9)
+        ])
+        for start in range(0, max(len(rows), 1), self.CHUNK_ROWS):
+            chunk = rows[start:start + self.CHUNK_ROWS]
+            t = Table([header] + chunk, colWidths=widths, repeatRows=1)
+            t.setStyle(style)
+            elements += [t, _RowsDone(len(chunk))]
+
         try:
-            doc = SimpleDocTemplate(path, pagesize=A4)
-            elements = []
-            styles = getSampleStyleSheet()
-            
-            elements.append(Paragraph(title, styles['Title']))
-            elements.append(Paragraph(f"Gerado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
-            elements.append(Spacer(1, 20))
-            
-            t = Table(data)
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.darkblue),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                ('FONTSIZE', (0,0), (-1,-1), 9)
-            ]))
-            
-            elements.append(t)
             doc.build(elements)
-            os.startfile(path)
-            # CORREÇÃO: Retorna True se sucesso
-            return True
-        except:
-            raise
\ No newline at end of file
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+        return path
+
+    def _col_widths(self, data, total_width):
+        """Larguras fixas para todos os blocos, proporcionais ao maior texto de cada coluna."""
+        longest = [max(len(str(v)) for v in col) for col in zip(*data)]
+        longest = [min(max(n, 4), 60) for n in longest]
+        return [total_width * n / sum(longest) for n in longest]
+
+class ReportCancelled(Exception):
+    pass
+
+class _RowsDone(Flowable):
+    """Marcador invisível após cada bloco (a tabela em si chega aqui já partida por página)."""
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = rows
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        pass
+
+class _ProgressDoc(SimpleDocTemplate):
+    """SimpleDocTemplate que avisa o progresso a cada tabela posicionada."""
+    def __init__(self, filename, progress=None, cancel=None, total=0, **kw):
+        super().__init__(filename, **kw)
+        self.progress, self.cancel, self.total, self.done = progress, cancel, total, 0
+
+    def afterFlowable(self, flowable):
+        if not isinstance(flowable, _RowsDone): return
+        self.done += flowable.rows
+        if self.progress: self.progress(self.done, self.total)
+        if self.cancel is not None and self.cancel.is_set(): raise ReportCancelled()
@@ -0,0 +1,41 @@
+import queue
+import threading
+from services.report_manager import ReportCancelled
+
+class ReportJob:
+    """Gera um relatório PDF numa thread própria.
+
+    `make_data` (montagem da tabela) e o layout rodam fora da UI; a thread
+    principal acompanha com poll() e pode pedir cancel() a qualquer momento.
+    """
+    def __init__(self, manager, path, title, make_data):
+        self.manager = manager
+        self.path = path
+        self.title = title
+        self.make_data = make_data
+        self.progress = (0, 0)
+        self._cancel = threading.Event()
+        self._results = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        try:
+            data = self.make_data()
+            if self._cancel.is_set(): raise ReportCancelled()
+            self.manager.build_pdf(self.path, self.title, data, progress=self._on_progress, cancel=self._cancel)
+            self._results.put(("ok", self.path))
+        except ReportCancelled:
+            self._results.put(("cancelled", None))
+        except Exception as e:
+            self._results.put(("error", str(e)))
+
+    def _on_progress(self, done, total):
+        self.progress = (done, total)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def poll(self):
+        """None enquanto roda; depois ('ok', caminho), ('cancelled', None) ou ('error', mensagem)."""
+        try: return self._results.get_nowait()
+        except queue.Empty: return None
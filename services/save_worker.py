@@ -0,0 +1,50 @@
+import queue
+import threading
+
+class SaveWorker:
+    """Thread dedicada de gravação.
+
+    O snapshot é tirado na thread principal (request) e gravado aqui. Pedidos
+    feitos durante uma gravação viram um único save logo em seguida, com o
+    estado mais recente. poll() deve ser chamado pela thread principal.
+    """
+    def __init__(self, stock):
+        self.stock = stock
+        self.busy = False
+        self.pending = False
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def request(self):
+        """Pede um save: 'started', 'queued' ou 'empty' (nada carregado)."""
+        if self.busy:
+            self.pending = True
+            return "queued"
+        job = self.stock.snapshot()
+        if job is None: return "empty"
+        self.busy = True
+        self._jobs.put(job)
+        return "started"
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                self._results.put((job, True, self.stock.write_snapshot(job)))
+            except Exception as e:
+                self._results.put((job, False, str(e)))
+
+    def poll(self):
+        """Aplica gravações concluídas; retorna [(ok, mensagem)] e dispara o save pendente."""
+        done = []
+        while True:
+            try: job, ok, msg = self._results.get_nowait()
+            except queue.Empty: break
+            self.stock.finish_save(job)
+            self.busy = False
+            done.append((ok, msg))
+        if done and self.pending and not self.busy:
+            self.pending = False
+            self.request()
+        return done
@@ -0,0 +1,90 @@
+import os
+import queue
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+class ThumbnailCache:
+    """Miniaturas prontas (180x180) em disco, geradas por um pool de threads.
+
+    Cada miniatura vira <pasta>/<sha1 do caminho>_<mtime>.png: trocar a foto
+    muda o mtime e invalida sozinho, e a versão antiga é apagada ao gravar a
+    nova. request() só agenda; os resultados saem por poll() na thread da UI,
+    que é quem pode criar as imagens do Tk.
+    """
+    def __init__(self, folder, size=(180, 180), workers=2):
+        self.folder = folder
+        self.size = size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbs")
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._results = queue.Queue()
+        self._files = None # sha1 do caminho -> {miniaturas gravadas}; a pasta é listada uma vez só
+        self._files_lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def _prefix(self, path):
+        return hashlib.sha1(os.path.abspath(path).lower().encode("utf-8")).hexdigest()
+
+    def cache_path(self, path):
+        return os.path.join(self.folder, f"{self._prefix(path)}_{os.stat(path).st_mtime_ns}.png")
+
+    def load(self, path):
+        """Miniatura de `path` (do disco se já existe; senão gera e grava)."""
+        cached = self.cache_path(path)
+        if os.path.exists(cached):
+            with Image.open(cached) as img:
+                img.load()
+                return img
+        with Image.open(path) as img:
+            img.draft("RGB", (self.size[0] * 2, self.size[1] * 2)) # JPEG: decodifica já reduzido
+            img.thumbnail(self.size)
+            thumb = img.convert("RGBA") if img.mode in ("P", "LA", "RGBA") else img.convert("RGB")
+        self._store(path, cached, thumb)
+        return thumb
+
+    def _store(self, path, cached, thumb):
+        prefix, name = self._prefix(path), os.path.basename(cached)
+        with self._files_lock:
+            if self._files is None:
+                self._files = {}
+                for old in os.listdir(self.folder):
+                    if old.endswith(".png"): self._files.setdefault(old.split("_")[0], set()).add(old)
+            stale = self._files.get(prefix, set()) - {name} # Miniaturas de versões anteriores da mesma foto
+            self._files[prefix] = {name}
+        for old in stale:
+            try: os.remove(os.path.join(self.folder, old))
+            except OSError: pass
+        tmp = f"{cached}.tmp"
+        thumb.save(tmp, format="PNG")
+        os.replace(tmp, cached)
+
+    def request(self, key, path):
+        """Agenda a miniatura de `path`; o resultado volta em poll() com `key`."""
+        try: job = (key, os.stat(path).st_mtime_ns) # Foto trocada no meio: pedido novo
+        except OSError: job = (key, None)
+        with self._lock:
+            if job in self._pending: return
+            self._pending.add(job)
+        self._pool.submit(self._run, job, path)
+
+    def _run(self, job, path):
+        try:
+            result = self.load(path)
+            # Foto trocada enquanto decodificava: não devolve a versão velha
+            if os.stat(path).st_mtime_ns != job[1]: result = self.load(path)
+        except Exception as e: result = e
+        self._results.put((job[0], path, result)) # Antes de sair de pendentes (ver App._poll_thumbs)
+        with self._lock: self._pending.discard(job)
+
+    def poll(self):
+        """[(key, caminho, imagem PIL ou exceção)] prontos desde a última chamada."""
+        done = []
+        while True:
+            try: done.append(self._results.get_nowait())
+            except queue.Empty: return done
+
+    @property
+    def busy(self):
+        with self._lock: return bool(self._pending)
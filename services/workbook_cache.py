@@ -0,0 +1,57 @@
+import os
+import pickle
+import hashlib
+
+CACHE_VERSION = 1
+
+class WorkbookCache:
+    """Cache binário (pickle) do DataFrame já limpo, ao lado do .xlsx.
+
+    A chave é tamanho + mtime + hash do conteúdo: se só o mtime mudou (cópia,
+    sincronização de rede) o hash confirma que o cache ainda vale.
+    """
+    def cache_path(self, path):
+        return f"{os.path.splitext(path)[0]}_cache.pkl"
+
+    def file_hash(self, path):
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def load(self, path):
+        """Retorna o DataFrame em cache ou None se o Excel foi alterado."""
+        cache = self.cache_path(path)
+        if not os.path.exists(cache): return None
+        try:
+            with open(cache, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") != CACHE_VERSION: return None
+            st = os.stat(path)
+            if data["size"] != st.st_size: return None
+            if data["mtime"] != st.st_mtime_ns:
+                # Mesmo tamanho mas mtime diferente: confere o conteúdo
+                if data["hash"] != self.file_hash(path): return None
+                data["mtime"] = st.st_mtime_ns
+                self._write(cache, data)
+            return data["df"]
+        except Exception as e:
+            print(f"Cache ignorado: {e}")
+            return None
+
+    def store(self, path, df):
+        """Grava o cache do Excel atual (falha silenciosa: é só otimização)."""
+        try:
+            st = os.stat(path)
+            data = {"version": CACHE_VERSION, "size": st.st_size, "mtime": st.st_mtime_ns,
+                    "hash": self.file_hash(path), "df": df}
+            self._write(self.cache_path(path), data)
+        except Exception as e:
+            print(f"Erro ao gravar cache: {e}")
+
+    def _write(self, cache, data):
+        tmp = f"{cache}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache)
@@ -0,0 +1,57 @@
+import os
+import pandas as pd
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+
+def header_names(header):
+    """Nomes das colunas como o pd.read_excel dá: vazio vira 'Unnamed: i', repetido 'Nome.1', número fica número."""
+    cells = ["" if h is None else int(h) if isinstance(h, float) and h.is_integer() else h for h in header]
+    return list(TextParser([cells], header=0).read().columns)
+
+def iter_workbook_chunks(path, chunk_size=2000):
+    """Lê a primeira aba em modo streaming (read-only), em blocos de linhas.
+
+    Gera (DataFrame do bloco, linhas lidas, total estimado). Arquivos .xls
+    (sem suporte no openpyxl) saem num único bloco via pd.read_excel.
+    """
+    if os.path.splitext(path)[1].lower() != ".xlsx":
+        df = pd.read_excel(path, header=0)
+        yield df, len(df), len(df)
+        return
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        total = max((ws.max_row or 1) - 1, 0)
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None: return
+        columns = header_names(header)
+
+        chunk, done = [], 0
+        for row in rows:
+            row = list(row[:len(columns)]) + [None] * (len(columns) - len(row))
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                done += len(chunk)
+                yield pd.DataFrame(chunk, columns=columns), done, max(total, done)
+                chunk = []
+        done += len(chunk)
+        yield pd.DataFrame(chunk, columns=columns), done, max(total, done)
+    finally:
+        wb.close()
+
+def read_workbook(path, chunk_size=2000, on_progress=None, on_chunk=None):
+    """Monta o DataFrame completo a partir dos blocos, avisando progresso."""
+    chunks = []
+    for chunk, done, total in iter_workbook_chunks(path, chunk_size):
+        chunks.append(chunk)
+        if on_chunk and len(chunks) == 1: on_chunk(chunk)
+        if on_progress: on_progress(done, total)
+    if not chunks: return pd.DataFrame()
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    # Como o read_excel: ignora linhas vazias no fim da planilha
+    filled = df.notna().any(axis=1).to_numpy()
+    last = filled.nonzero()[0]
+    df = df.iloc[:last[-1] + 1] if len(last) else df.iloc[:0]
+    return df.infer_objects().reset_index(drop=True)
@@ -0,0 +1,150 @@
+import os
+import re
+import math
+import posixpath
+import zipfile
+import numbers
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+class PatchError(Exception):
+    """A planilha não pode ser remendada; use a reescrita completa."""
+
+ROW_RE = re.compile(r'<row\b[^>]*?\br="(\d+)"[^>]*?(?:/>|>.*?</row>)', re.S)
+CELL_RE = re.compile(r'<c\b[^>]*?\br="([A-Z]+)\d+"[^>]*?(?:/>|>.*?</c>)', re.S)
+# Estruturas com referências de célula que ficariam erradas ao remover linhas
+REF_TAGS = ("<f", "<mergeCell", "<conditionalFormatting", "<dataValidation", "<hyperlink", "<tablePart")
+
+def col_letter(col):
+    """0 -> A, 25 -> Z, 26 -> AA."""
+    letters = ""
+    col += 1
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def col_index(letters):
+    n = 0
+    for ch in letters: n = n * 26 + ord(ch) - 64
+    return n - 1
+
+def cell_xml(ref, value, style=""):
+    """XML de uma célula; textos vão como inlineStr para não mexer no sharedStrings."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return f'<c r="{ref}"{style}/>'
+    if hasattr(value, "item"): value = value.item() # Tipos numpy
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{style} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}"{style}><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        if math.isnan(value): return f'<c r="{ref}"{style}/>'
+        return f'<c r="{ref}"{style}><v>{float(value)!r}</v></c>'
+    if isinstance(value, str):
+        return f'<c r="{ref}"{style} t="inlineStr"><is><t xml:space="preserve">{escape(value)}</t></is></c>'
+    raise PatchError(f"Tipo não suportado: {type(value).__name__}")
+
+def first_sheet_path(zf):
+    """Caminho do XML da primeira aba dentro do .xlsx."""
+    ns = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+          "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+          "p": "http://schemas.openxmlformats.org/package/2006/relationships"}
+    sheet = ET.fromstring(zf.read("xl/workbook.xml")).find("m:sheets/m:sheet", ns)
+    if sheet is None: raise PatchError("Planilha sem abas")
+    rid = sheet.get(f"{{{ns['r']}}}id")
+    for rel in ET.fromstring(zf.read("xl/_rels/workbook.xml.rels")).findall("p:Relationship", ns):
+        if rel.get("Id") == rid:
+            target = rel.get("Target")
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+    raise PatchError("Aba não encontrada")
+
+def _set_cell(row, ref_col, r, value):
+    """Troca (ou insere na ordem) uma célula dentro do XML da linha."""
+    new_style = ""
+    insert_at = None
+    for m in CELL_RE.finditer(row):
+        col = col_index(m.group(1))
+        if col == ref_col:
+            style = re.search(r'\bs="\d+"', m.group(0)[:m.group(0).index(">")])
+            new_style = f" {style.group(0)}" if style else ""
+            return row[:m.start()] + cell_xml(f"{col_letter(ref_col)}{r}", value, new_style) + row[m.end():]
+        if col > ref_col and insert_at is None: insert_at = m.start()
+    if row.endswith("/>"): raise PatchError("Linha vazia no meio dos dados")
+    if insert_at is None: insert_at = len(row) - len("</row>")
+    return row[:insert_at] + cell_xml(f"{col_letter(ref_col)}{r}", value) + row[insert_at:]
+
+def _renumber(row, r):
+    row = re.sub(r'(<row\b[^>]*?\br=")\d+"', rf'\g<1>{r}"', row, count=1)
+    return re.sub(r'(<c\b[^>]*?\br="[A-Z]+)\d+"', rf'\g<1>{r}"', row)
+
+def replace_atomic(tmp, dest, on_ready=None):
+    """fsync do temporário e troca atômica: o destino nunca fica pela metade.
+
+    on_ready(tmp) roda com o temporário já no disco, logo antes da troca
+    (o os.replace mantém tamanho e mtime, então a assinatura já é a final).
+    """
+    with open(tmp, "rb+") as f:
+        os.fsync(f.fileno())
+    if on_ready: on_ready(tmp)
+    os.replace(tmp, dest)
+
+def write_full(path, df, on_ready=None):
+    """Reescrita completa (fallback), também via temporário."""
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            df.to_excel(f, index=False, engine="openpyxl")
+        replace_atomic(tmp, path, on_ready) # Falha aqui (planilha aberta no Excel) também limpa o .tmp
+    except Exception:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def patch_workbook(path, df, tracker, dest=None, on_ready=None):
+    """Grava só as células/linhas alteradas no XML da primeira aba.
+
+    As demais partes do .xlsx (estilos, outras abas, sharedStrings) são
+    copiadas como estão. Levanta PatchError se a planilha não bate com o
+    que foi carregado.
+    """
+    dest = dest or path
+    tmp = f"{dest}.tmp"
+    try:
+        with zipfile.ZipFile(path) as zin:
+            sheet_path = first_sheet_path(zin)
+            xml = zin.read(sheet_path).decode("utf-8")
+            if tracker.deleted and any(tag in xml for tag in REF_TAGS):
+                raise PatchError("Aba com fórmulas/mesclagens: remoção exige reescrita")
+
+            start, end = xml.find("<sheetData"), xml.find("</sheetData>")
+            if start < 0 or end < 0: raise PatchError("sheetData não encontrado")
+            body_start = xml.index(">", start) + 1
+            rows = [(int(m.group(1)), m.group(0)) for m in ROW_RE.finditer(xml, body_start, end)]
+            if [r for r, _ in rows] != list(range(1, len(rows) + 1)) or len(rows) - 1 != tracker.loaded_rows:
+                raise PatchError("Planilha diferente da carregada")
+
+            header, data = rows[0][1], [row for _, row in rows[1:]]
+            for pos in tracker.deleted: del data[pos]
+            for pos, col in tracker.cells:
+                if pos < tracker.base_rows:
+                    data[pos] = _set_cell(data[pos], col, pos + 2, df.iat[pos, col])
+            for pos in range(tracker.base_rows, len(df)):
+                r = pos + 2
+                cells = "".join(cell_xml(f"{col_letter(c)}{r}", df.iat[pos, c]) for c in range(len(df.columns)))
+                data.append(f'<row r="{r}">{cells}</row>')
+            if tracker.deleted:
+                first = min(tracker.deleted)
+                for pos in range(first, tracker.base_rows): data[pos] = _renumber(data[pos], pos + 2)
+
+            last_ref = f"{col_letter(len(df.columns) - 1)}{len(df) + 1}"
+            head = re.sub(r'<dimension ref="[^"]*"', f'<dimension ref="A1:{last_ref}"', xml[:body_start], count=1)
+            new_xml = head + header + "".join(data) + xml[end:]
+
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zout:
+                for item in zin.infolist():
+                    data_bytes = new_xml.encode("utf-8") if item.filename == sheet_path else zin.read(item.filename)
+                    zout.writestr(item, data_bytes)
+        replace_atomic(tmp, dest, on_ready) # Fora do with: no Windows o original ainda aberto impede a troca
+    except Exception:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
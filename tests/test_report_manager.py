@@ -0,0 +1,10 @@
+import pandas as pd
+from services.report_manager import ReportManager
+
+def test_level_groups_non_positive_total_in_lowest_level():
+    df = pd.DataFrame({"ID": [1, 2, 3], "Nome": ["Peça A", "Peça B", "Peça C"],
+                       "Canoas": [5, -3, 30], "PF": [-5, 1, 0]})
+    data = ReportManager().generate_stock_list(df, group="level")
+    titles = [row[1] for row in data[1:] if row[0] == ""]
+    assert titles == ["Baixo (1-5) - 2 itens", "Alto (21+) - 1 item"]
+    assert [row[1] for row in data[2:4]] == ["Peça A", "Peça B"]
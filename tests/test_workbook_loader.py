@@ -0,0 +1,18 @@
+import pandas as pd
+from openpyxl import Workbook
+from services.workbook_loader import read_workbook
+
+def test_headers_match_read_excel(tmp_path):
+    path = str(tmp_path / "estoque.xlsx")
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["ID", "Nome", "Canoas", "PF", "Nome", 2024, None, 1.5, "Nome.1", "Nome"])
+    ws.append([1, "Peça A", 3, 0, "x", 10, "y", 2.5, "z", "w"])
+    ws.append([2, "Peça B", 0, 4, "x", 20, "y", 3.5, "z", "w"])
+    wb.save(path)
+
+    df = read_workbook(path, chunk_size=1)
+    expected = pd.read_excel(path, header=0)
+    assert list(df.columns) == list(expected.columns)
+    assert [type(c) for c in df.columns] == [type(c) for c in expected.columns]
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
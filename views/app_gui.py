@@ -1,30 +1,48 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox, ttk
 import threading
+import queue
 import requests
 import os
 import sys
 import subprocess
 import pandas as pd
-from PIL import Image
+import numpy as np
+from datetime import datetime, timedelta
 
 # Importa módulos locais
 from config import CONFIG
 from models.stock_manager import StockManager
 from services.image_manager import ImageManager
+from services.thumbnail_cache import ThumbnailCache
+from services.image_cache import ImageCache
+from services.image_importer import BulkImageImport
+from services.batch_movements import BatchError, ScannerSession, read_movements_csv
 from services.report_manager import ReportManager
+from services.report_worker import ReportJob
+from services.save_worker import SaveWorker
+from services.history_store import HistoryStore
+from services.history_reader import iter_pages_reversed
+from views.virtual_table import VirtualTable
 
 class App(ctk.CTk):
+    PREFETCH_RADIUS = 2 # Linhas acima/abaixo com foto gerada de antemão
+
     def __init__(self):
         super().__init__()
         
         # Inicializa Gerenciadores
         self.stock = StockManager()
+        self.stock.debug_totals = CONFIG.get("DEBUG_TOTALS", False)
+        self.stock.subscribe(self._on_stock_event)
+        self.saver = SaveWorker(self.stock)
         self.img_mgr = ImageManager()
         self.rep_mgr = ReportManager()
         
         # CACHE DE IMAGENS: Impede o erro pyimage e melhora performance
-        self.image_cache = {}
+        self.image_cache = ImageCache(CONFIG.get("IMAGE_CACHE_MB", 32) * 1024 * 1024)
+        self.thumbs = ThumbnailCache(os.path.join(self.img_mgr.img_folder, ".miniaturas"))
+        self._thumb_polling = False
         
         # Configuração UI
         ctk.set_appearance_mode(CONFIG["THEME"])
@@ -33,9 +51,15 @@ class App(ctk.CTk):
         self.geometry("1200x800")
         
         self.selected_item_name = None
+        self._search_job = None
+        self._loading = False
+        self._load_queue = None
+        self._preview_df = None # Primeiro bloco exibido enquanto a planilha carrega
         
         self._setup_layout()
         
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
         # Thread de Update
         self.after(2000, lambda: threading.Thread(target=self._check_update_silent, daemon=True).start())
 
@@ -66,13 +90,20 @@ class App(ctk.CTk):
         self._create_btn("📂 Abrir Excel", self.action_load)
         self._create_btn("➕ Novo Item", self.action_new_item)
         self._create_btn("🗑️ Excluir Item", self.action_delete, color="#e74c3c", hover="#5a1e1e")
+        self._create_btn("📦 Movimentar Lote", self.action_batch)
         self._create_btn("📜 Histórico", self.action_history)
         self._create_btn("📄 Relatórios", self.action_reports, color="#f39c12", hover="#5c3c00")
+        self._create_btn("🖼️ Importar Fotos", self.action_import_photos)
         self._create_btn("🔄 Update", self.action_check_update_manual, color="#34495e")
         
         self.btn_save = ctk.CTkButton(self.sidebar, text="💾 SALVAR TUDO", height=50, fg_color="#27ae60", hover_color="#219150", font=ctk.CTkFont(weight="bold"), command=self.action_save)
         self.btn_save.pack(pady=20, padx=20, side="bottom")
 
+        # Status de carregamento/salvamento
+        self.lbl_status = ctk.CTkLabel(self.sidebar, text="", text_color="gray70", font=ctk.CTkFont(size=11))
+        self.lbl_status.pack(side="bottom")
+        self.progress = ctk.CTkProgressBar(self.sidebar, width=180)
+
         # --- ÁREA PRINCIPAL ---
         self.main_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.main_frame.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
@@ -91,7 +122,11 @@ class App(ctk.CTk):
         ctk.CTkOptionMenu(self.frm_filter, width=150, values=["Todos", "Saldo Canoas", "Zero Canoas", "Saldo PF", "Zero PF"], variable=self.var_filter, command=lambda x: self.update_table()).pack(side="left", padx=(0,10))
         self.entry_search = ctk.CTkEntry(self.frm_filter, placeholder_text="🔍 Pesquisar produto...", height=35)
         self.entry_search.pack(side="left", fill="x", expand=True)
-        self.entry_search.bind("<KeyRelease>", lambda x: self.update_table())
+        self.entry_search.bind("<KeyRelease>", self._schedule_search)
+        self.var_fuzzy = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(self.frm_filter, text="Aproximada", width=110, variable=self.var_fuzzy, command=self.update_table).pack(side="left", padx=(10,0))
+        self.lbl_counts = ctk.CTkLabel(self.frm_filter, text="", text_color="gray70", font=ctk.CTkFont(size=11))
+        self.lbl_counts.pack(side="left", padx=(10,0))
 
         # Tabela
         self.frm_table = ctk.CTkFrame(self.main_frame, fg_color="transparent")
@@ -102,20 +137,14 @@ class App(ctk.CTk):
         style.configure("Treeview.Heading", background="#1f538d", foreground="white", relief="flat", font=("Segoe UI", 10, "bold"))
         style.map("Treeview", background=[('selected', '#2980b9')])
 
-        self.scroll = ctk.CTkScrollbar(self.frm_table)
-        self.scroll.pack(side="right", fill="y")
-        self.tree = ttk.Treeview(self.frm_table, columns=("ID","NOME","C","PF"), show="headings", yscrollcommand=self.scroll.set)
-        self.scroll.configure(command=self.tree.yview)
-        
-        self.tree.heading("ID", text="#"); self.tree.column("ID", width=50, anchor="center")
-        self.tree.heading("NOME", text="PRODUTO"); self.tree.column("NOME", width=500)
-        self.tree.heading("C", text="CANOAS"); self.tree.column("C", width=100, anchor="center")
-        self.tree.heading("PF", text="PF"); self.tree.column("PF", width=100, anchor="center")
-        
+        # Tabela virtual: só as linhas visíveis viram itens do Treeview
+        self.sort_by = None; self.sort_desc = False
+        self.table = VirtualTable(self.frm_table, [("ID", "#", 50, "center"), ("NOME", "PRODUTO", 500, "w"), ("C", "CANOAS", 100, "center"), ("PF", "PF", 100, "center")],
+                                  render_row=self._render_row, on_select=self._on_select, on_heading=self._on_heading)
+        self.table.pack(fill="both", expand=True)
+        self.tree = self.table.tree
         self.tree.tag_configure('positivo', foreground='#2ecc71')
         self.tree.tag_configure('zerado', foreground='#e74c3c')
-        self.tree.pack(fill="both", expand=True)
-        self.tree.bind("<<TreeviewSelect>>", self._on_select)
 
         # Painel Ações
         self.frm_actions = ctk.CTkFrame(self, height=120, corner_radius=15, fg_color="#2b2b2b")
@@ -153,38 +182,60 @@ class App(ctk.CTk):
 
     # --- LÓGICA DE IMAGEM ---
     def _display_product_image(self, item_name):
-        self.lbl_photo.configure(image="", text="Carregando...")
-        
-        if item_name in self.image_cache:
-            self.lbl_photo.configure(image=self.image_cache[item_name], text="")
+        img = self.image_cache.get(item_name)
+        if img is not None:
+            self.lbl_photo.configure(image=img, text="")
             self.btn_remove_photo.configure(state="normal")
             return
 
         path = self.img_mgr.find_image_path(item_name)
         if path:
-            try:
-                pil_img = Image.open(path)
-                pil_img.thumbnail((180, 180))
-                ctk_img = ctk.CTkImage(light_image=pil_img, dark_image=pil_img, size=pil_img.size)
-                self.image_cache[item_name] = ctk_img
-                self.lbl_photo.configure(image=ctk_img, text="")
-                self.btn_remove_photo.configure(state="normal")
-            except:
-                self.lbl_photo.configure(image="", text="Erro Foto")
-                self.btn_remove_photo.configure(state="disabled")
+            # Miniatura sai do pool de threads; _poll_thumbs mostra quando chegar
+            self.lbl_photo.configure(image="", text="Carregando...")
+            self.btn_remove_photo.configure(state="normal")
+            self._request_thumb(item_name, path)
         else:
             self.lbl_photo.configure(image="", text="[Sem Foto]")
             self.btn_remove_photo.configure(state="disabled")
 
+    def _request_thumb(self, item_name, path):
+        self.thumbs.request(item_name, path)
+        if not self._thumb_polling:
+            self._thumb_polling = True
+            self.after(30, self._poll_thumbs)
+
+    def _poll_thumbs(self):
+        busy = self.thumbs.busy # Antes do poll: ocioso aqui = todos os resultados já na fila
+        for name, path, result in self.thumbs.poll():
+            if isinstance(result, Exception):
+                if name == self.selected_item_name:
+                    self.lbl_photo.configure(image="", text="Erro Foto")
+                    self.btn_remove_photo.configure(state="disabled")
+                continue
+            img = ctk.CTkImage(light_image=result, dark_image=result, size=result.size)
+            self.image_cache.put(name, img, result.size)
+            if name == self.selected_item_name:
+                self.lbl_photo.configure(image=img, text="")
+        if busy: self.after(30, self._poll_thumbs)
+        else: self._thumb_polling = False
+
+    def _prefetch_neighbors(self, idx):
+        """Gera de antemão as fotos das linhas vizinhas (navegação com as setas)."""
+        for n in self.table.neighbors(idx, self.PREFETCH_RADIUS):
+            name = self._view_name(n)
+            if name in self.image_cache: continue
+            path = self.img_mgr.find_image_path(name)
+            if path: self._request_thumb(name, path)
+
     # --- EVENTOS ---
-    def _on_select(self, e):
-        sel = self.tree.selection()
-        if sel:
-            name = self.tree.item(sel[0])['values'][1]
+    def _on_select(self, idx):
+        if idx is not None:
+            name = self._view_name(idx)
             self.selected_item_name = name
             self.lbl_sel.configure(text=f"Selecionado: {name}", text_color="#3498db")
             self.btn_photo.configure(state="normal")
             self._display_product_image(name)
+            self._prefetch_neighbors(idx)
         else:
             self.selected_item_name = None
             self.lbl_sel.configure(text="Selecione um item...", text_color="white")
@@ -198,8 +249,7 @@ class App(ctk.CTk):
         if path:
             try:
                 self.img_mgr.save_image(path, self.selected_item_name)
-                if self.selected_item_name in self.image_cache:
-                    del self.image_cache[self.selected_item_name]
+                self.image_cache.discard(self.selected_item_name)
                 self._display_product_image(self.selected_item_name)
                 messagebox.showinfo("Sucesso", "Foto salva!")
             except Exception as e: messagebox.showerror("Erro", str(e))
@@ -214,8 +264,7 @@ class App(ctk.CTk):
                 self.img_mgr.delete_image(self.selected_item_name)
                 
                 # 2. Limpa o Cache
-                if self.selected_item_name in self.image_cache:
-                    del self.image_cache[self.selected_item_name]
+                self.image_cache.discard(self.selected_item_name)
                 
                 # 3. Atualiza UI
                 self._display_product_image(self.selected_item_name)
@@ -224,30 +273,97 @@ class App(ctk.CTk):
                 messagebox.showerror("Erro", f"Não foi possível remover a foto: {e}")
 
     # --- RESTANTE DAS FUNÇÕES (Filtros, Processamento, etc.) ---
+    def _row_display(self, idx, row):
+        """Retorna (valores, tag) de uma linha do DataFrame para a tabela."""
+        name = str(row.iloc[1])
+        c, pf = int(row.iloc[2]), int(row.iloc[3])
+        tag = 'positivo' if (c > 0 or pf > 0) else 'zerado'
+        raw_id = row.iloc[0]
+        display_id = idx + 2
+        if pd.notna(raw_id) and str(raw_id).strip() != "":
+            try: display_id = int(raw_id)
+            except: display_id = str(raw_id)
+        return (display_id, name, c, pf), tag
+
+    def _schedule_search(self, e=None):
+        """Agrupa teclas rápidas: só a última consulta roda (debounce)."""
+        if self._search_job: self.after_cancel(self._search_job)
+        self._search_job = self.after(150, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        self.update_table()
+
+    def _view_name(self, idx):
+        if self._preview_df is not None: return str(self._preview_df.iat[idx, 1])
+        return str(self.stock.cell(idx, 1))
+
+    def _render_row(self, idx):
+        # Direto do StockManager: desenhar uma linha não compacta a tabela inteira
+        row = self._preview_df.iloc[idx] if self._preview_df is not None else self.stock.row(idx)
+        return self._row_display(idx, row)
+
     def update_table(self):
-        if self.stock.df is None: return
-        self.tree.delete(*self.tree.get_children())
-        term = self.entry_search.get().lower()
-        flt = self.var_filter.get()
-        for idx, row in self.stock.df.iterrows():
-            name = str(row.iloc[1])
-            if term in name.lower():
-                c, pf = int(row.iloc[2]), int(row.iloc[3])
-                show = True
-                if flt == "Saldo Canoas" and c <= 0: show = False
-                elif flt == "Zero Canoas" and c > 0: show = False
-                elif flt == "Saldo PF" and pf <= 0: show = False
-                elif flt == "Zero PF" and pf > 0: show = False
-                if show:
-                    tag = 'positivo' if (c > 0 or pf > 0) else 'zerado'
-                    raw_id = row.iloc[0]
-                    display_id = idx + 2
-                    if pd.notna(raw_id) and str(raw_id).strip() != "":
-                        try: display_id = int(raw_id)
-                        except: display_id = str(raw_id)
-                    self.tree.insert("", "end", iid=idx, values=(display_id, name, c, pf), tags=(tag,))
+        """Recalcula os índices filtrados/ordenados; a tabela desenha só a janela visível."""
+        if self.stock.table is None or self._loading: return
+        if self._fuzzy_active():
+            # Modo aproximado: mantém a ordem de similaridade
+            rows = self.stock.search.fuzzy_query(self.entry_search.get(), self.var_filter.get())
+            self.table.set_rows(rows, keep_position=False)
+        else:
+            rows = self.stock.search.query(self.entry_search.get(), self.var_filter.get())
+            self.table.set_rows(self._sorted_rows(rows))
+        self._update_totals()
+
+    def _fuzzy_active(self):
+        return self.var_fuzzy.get() and bool(self.entry_search.get().strip())
+
+    def _sorted_rows(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.sort_by is None or not len(rows): return rows
+        col = {"ID": 0, "NOME": 1, "C": 2, "PF": 3}[self.sort_by]
+        values = pd.Series(self.stock.table.column(col)[rows]) # Colunas vivas: sem compactar após exclusões
+        if col == 0: values = pd.to_numeric(values, errors='coerce').fillna(pd.Series(rows + 2))
+        elif col == 1: values = values.astype(str).str.lower()
+        # Posto denso (vale para texto também); empates ficam na ordem da planilha nos dois sentidos
+        keys = values.rank(method="dense").to_numpy()
+        return rows[np.lexsort((np.arange(len(rows)), -keys if self.sort_desc else keys))]
+
+    def _on_heading(self, key):
+        """Clique no cabeçalho: ordena (asc -> desc -> ordem da planilha)."""
+        if self.sort_by != key: self.sort_by, self.sort_desc = key, False
+        elif not self.sort_desc: self.sort_desc = True
+        else: self.sort_by, self.sort_desc = None, False
+        self.update_table()
+
+    def _update_totals(self):
         tc, tpf = self.stock.get_totals()
         self.lbl_tot_c.configure(text=str(tc)); self.lbl_tot_pf.configure(text=str(tpf))
+        n = self.stock.get_counts()
+        self.lbl_counts.configure(text=f"{n['Com saldo']} com saldo | zerados: {n['Zero Canoas']} Canoas, {n['Zero PF']} PF")
+
+    def _on_stock_event(self, event, index):
+        """Aplica na tabela apenas a linha alterada no StockManager."""
+        if event == "loaded":
+            self.table.clear_selection(); self.table.first = 0
+        if event in ("loaded", "batch") or index is None:
+            self.update_table(); return # Lote: uma atualização só, no fim
+        if event == "removed":
+            self.table.remove_index(index)
+        else:
+            self._patch_row(index)
+        self._update_totals()
+
+    def _patch_row(self, idx):
+        shown = self.table.contains(idx)
+        if self._fuzzy_active():
+            if not shown: self.update_table(); return # Novo item pode entrar no ranking
+            visible = self.stock.search.matches(idx, "", self.var_filter.get())
+        else:
+            visible = self.stock.search.matches(idx, self.entry_search.get(), self.var_filter.get())
+        if visible and shown: self.table.refresh_row(idx)
+        elif visible: self.table.insert_index(idx, ordered=self.sort_by is None)
+        elif shown: self.table.discard_index(idx)
 
     def _adjust_ui(self):
         op = self.var_op.get()
@@ -259,19 +375,87 @@ class App(ctk.CTk):
             self.btn_ok.configure(text=op.upper(), fg_color="#27ae60" if op == "Entrada" else "#e74c3c")
 
     def action_load(self):
+        if self._loading: return
+        if self.saver.busy:
+            # O replay do journal repetiria movimentações que essa gravação já está levando ao histórico
+            messagebox.showinfo("Aguarde", "Gravação em andamento. Abra a planilha quando ela terminar.")
+            return
         path = filedialog.askopenfilename(filetypes=[("Excel", "*.xlsx *.xls")])
-        if path:
-            ok, msg = self.stock.load_file(path)
-            if ok: self.update_table(); messagebox.showinfo("Sucesso", msg)
-            else: messagebox.showerror("Erro", msg)
+        if not path: return
+        self._loading = True
+        self._load_queue = q = queue.Queue()
+        self.progress.set(0); self.progress.pack(side="bottom", pady=(0,5))
+        self.lbl_status.configure(text="Abrindo planilha...")
+
+        def run():
+            try:
+                df, from_cache = self.stock.read_file(path, on_progress=lambda done, total: q.put(("progress", done, total)), on_chunk=lambda chunk: q.put(("chunk", chunk)))
+                q.put(("done", path, df, from_cache))
+            except Exception as e: q.put(("error", str(e)))
+        threading.Thread(target=run, daemon=True).start()
+        self.after(50, self._poll_load)
+
+    def _poll_load(self):
+        """Consome as mensagens da thread de leitura (o Tk só é tocado aqui)."""
+        while True:
+            try: msg = self._load_queue.get_nowait()
+            except queue.Empty: break
+            if msg[0] == "progress":
+                done, total = msg[1], msg[2]
+                self.progress.set(done / total if total else 0)
+                self.lbl_status.configure(text=f"Lendo {done}/{total} linhas...")
+            elif msg[0] == "chunk":
+                self._preview_df = msg[1]
+                self.table.clear_selection(); self.table.set_rows(np.arange(len(msg[1])), keep_position=False)
+            else:
+                self._finish_load(msg); return
+        self.after(50, self._poll_load)
+
+    def _finish_load(self, msg):
+        self._loading = False
+        self._preview_df = None
+        self.progress.pack_forget()
+        if msg[0] == "done":
+            _, path, df, from_cache = msg
+            replayed = self.stock.apply_loaded(path, df)
+            self.lbl_status.configure(text=f"{len(df)} itens carregados")
+            msg = "Carregado do cache" if from_cache else "Carregado com sucesso"
+            if replayed: msg += f"\n{replayed} movimentações não salvas foram recuperadas."
+            messagebox.showinfo("Sucesso", msg)
+        else:
+            self.lbl_status.configure(text="")
+            self.table.set_rows([]); self.update_table()
+            messagebox.showerror("Erro", msg[1])
 
     def action_save(self):
-        ok, msg = self.stock.save_data()
-        if ok: messagebox.showinfo("Sucesso", f"Dados salvos!\nBackup: {msg}")
-        else: messagebox.showerror("Erro", msg)
+        """Salva em segundo plano; a interface mostra o status em vez de travar."""
+        if self._loading: return
+        status = self.saver.request()
+        if status == "started":
+            self.lbl_status.configure(text="Salvando...")
+            self.after(100, self._poll_save)
+        elif status == "queued":
+            self.lbl_status.configure(text="Salvando... (novo save na fila)")
+
+    def _poll_save(self):
+        for ok, msg in self.saver.poll():
+            if ok: self.lbl_status.configure(text=f"Salvo às {datetime.now().strftime('%H:%M:%S')} (backup: {msg})")
+            else:
+                self.lbl_status.configure(text="Falha ao salvar")
+                messagebox.showerror("Erro", msg)
+        if self.saver.busy: self.after(100, self._poll_save)
+
+    def _on_close(self):
+        # Não encerra no meio de uma gravação
+        if self.saver.busy:
+            self.lbl_status.configure(text="Aguardando gravação...")
+            self.after(200, self._on_close)
+            return
+        self.stock.close()
+        self.destroy()
 
     def action_new_item(self):
-        if self.stock.df is None: return
+        if self.stock.table is None or self._loading: return
         top = ctk.CTkToplevel(self); top.geometry("400x350"); top.attributes("-topmost", True)
         ctk.CTkLabel(top, text="Novo Item", font=("Arial", 16, "bold")).pack(pady=20)
         ctk.CTkLabel(top, text="Nome:").pack(anchor="w", padx=20); en = ctk.CTkEntry(top); en.pack(fill="x", padx=20)
@@ -281,51 +465,229 @@ class App(ctk.CTk):
             try:
                 qc, qp = int(ec.get()), int(ep.get())
                 if self.stock.add_item(en.get().upper(), qc, qp):
-                    self.update_table(); top.destroy(); self.tree.yview_moveto(1); messagebox.showinfo("Sucesso", "Item criado.")
+                    top.destroy(); self.table.select(self.stock.row_count() - 1); messagebox.showinfo("Sucesso", "Item criado.")
             except: messagebox.showerror("Erro", "Verifique os números.")
         ctk.CTkButton(top, text="Salvar", command=save, fg_color="#27ae60").pack(pady=20)
 
     def action_delete(self):
-        sel = self.tree.selection()
-        if not sel: return
+        idx = self.table.selected_index
+        if idx is None or self._loading: return
         if messagebox.askyesno("Confirmar", "Apagar item selecionado?"):
-            self.stock.remove_item(int(sel[0])); self.update_table(); messagebox.showinfo("Sucesso", "Removido. Salve para confirmar.")
+            self.stock.remove_item(idx); messagebox.showinfo("Sucesso", "Removido. Salve para confirmar.")
 
     def action_process(self):
-        sel = self.tree.selection()
-        if not sel: return
+        idx = self.table.selected_index
+        if idx is None or self._loading: return
         try:
             qty = int(self.entry_qty.get())
             if qty <= 0: raise ValueError
-            idx = int(sel[0])
             self.stock.update_stock(idx, self.var_op.get(), qty, self.var_loc.get(), self.var_transf.get())
-            self.update_table(); self.tree.selection_set(str(idx))
         except ValueError as ve: messagebox.showerror("Erro", str(ve))
         except Exception as e: messagebox.showerror("Erro", str(e))
 
+    def action_batch(self):
+        """Lote de movimentações: CSV (contagem, nota de fornecedor) ou leituras do leitor de código."""
+        if self.stock.table is None or self._loading: return
+        top = ctk.CTkToplevel(self); top.geometry("420x520"); top.attributes("-topmost", True)
+        ctk.CTkLabel(top, text="Movimentar em Lote", font=("Arial", 16, "bold")).pack(pady=(15, 5))
+        def apply(moves, source):
+            try: summary = self.stock.apply_movements(moves, source)
+            except BatchError as e:
+                messagebox.showerror("Lote recusado", f"Nada foi aplicado.\n\n{e}", parent=top); return
+            top.destroy()
+            messagebox.showinfo("Sucesso", f"{summary['moves']} movimentações em {summary['items']} itens. Salve para confirmar.")
+        def from_csv():
+            path = filedialog.askopenfilename(parent=top, filetypes=[("CSV", "*.csv *.txt")])
+            if not path: return
+            moves, errors = read_movements_csv(path)
+            if errors: messagebox.showerror("Lote recusado", f"Nada foi aplicado.\n\n{BatchError(errors)}", parent=top); return
+            apply(moves, os.path.basename(path))
+        ctk.CTkButton(top, text="📄 Importar CSV...", command=from_csv).pack(pady=5)
+        ctk.CTkLabel(top, text="Colunas: item;operacao;quantidade;local", text_color="gray70").pack()
+
+        # Leitor de código: cada leitura (código + Enter) soma 1 unidade
+        frm = ctk.CTkFrame(top); frm.pack(fill="both", expand=True, padx=15, pady=15)
+        var_op = ctk.StringVar(value="Entrada"); var_loc = ctk.StringVar(value="Canoas")
+        cmb_op = ctk.CTkOptionMenu(frm, values=["Entrada", "Saida", "Transf"], variable=var_op); cmb_op.pack(pady=5)
+        cmb_loc = ctk.CTkOptionMenu(frm, values=["Canoas", "Passo Fundo", "Canoas -> PF", "PF -> Canoas"], variable=var_loc); cmb_loc.pack(pady=5)
+        en_code = ctk.CTkEntry(frm, placeholder_text="Leia o código (ID ou nome)..."); en_code.pack(fill="x", padx=10, pady=5)
+        lbl_count = ctk.CTkLabel(frm, text="0 leituras"); lbl_count.pack()
+        txt = ctk.CTkTextbox(frm, height=150); txt.pack(fill="both", expand=True, padx=10, pady=5)
+        session = []
+        def refresh():
+            lbl_count.configure(text=f"{len(session[0]) if session else 0} leituras")
+            txt.delete("1.0", "end")
+            if session: txt.insert("end", "".join(f"{code}: {qty}\n" for code, qty in session[0].counts.items()))
+        def on_scan(e=None):
+            code = en_code.get(); en_code.delete(0, "end")
+            if not session:
+                try: session.append(ScannerSession(var_op.get(), var_loc.get()))
+                except ValueError as err: messagebox.showerror("Erro", str(err), parent=top); return
+                cmb_op.configure(state="disabled"); cmb_loc.configure(state="disabled") # Fixos durante a sessão
+            session[0].scan(code); refresh()
+        def undo():
+            if session: session[0].undo(); refresh()
+        en_code.bind("<Return>", on_scan); en_code.focus_set()
+        frm_btn = ctk.CTkFrame(frm, fg_color="transparent"); frm_btn.pack(pady=5)
+        ctk.CTkButton(frm_btn, text="Desfazer", width=100, fg_color="#444", command=undo).pack(side="left", padx=5)
+        ctk.CTkButton(frm_btn, text="Aplicar", width=100, fg_color="#27ae60",
+                      command=lambda: session and apply(session[0].movements(), "leitor")).pack(side="left", padx=5)
+
     def action_reports(self):
         if self.stock.df is None: return
-        top = ctk.CTkToplevel(self); top.geometry("300x250"); top.attributes("-topmost", True)
+        top = ctk.CTkToplevel(self); top.geometry("300x410"); top.attributes("-topmost", True)
+        windows = {"Todo o histórico": None, "Últimos 30 dias": 30, "Últimos 90 dias": 90, "Últimos 365 dias": 365}
+        locations = {"Ambos os locais": None, "Canoas": "Canoas", "Passo Fundo": "Passo Fundo"}
+        var_window = ctk.StringVar(value="Últimos 90 dias"); var_location = ctk.StringVar(value="Ambos os locais")
+        sorts = {text: key for key, text in self.rep_mgr.STOCK_SORTS.items()}
+        groups = {text: key for key, text in self.rep_mgr.STOCK_GROUPS.items()}
+        var_sort = ctk.StringVar(value=self.rep_mgr.STOCK_SORTS["id"]); var_group = ctk.StringVar(value=self.rep_mgr.STOCK_GROUPS[None])
         def gen(tipo):
+            days, location = windows[var_window.get()], locations[var_location.get()]
+            sort, group = sorts[var_sort.get()], groups[var_group.get()]
+            label = f"{var_window.get()} - {var_location.get()}"
             top.destroy()
-            try:
-                res = False
-                if tipo == "abc": res = self.rep_mgr.save_pdf("Relatório ABC", self.rep_mgr.generate_abc(self.stock.df, self.stock.history_path), "ABC.pdf")
-                else: res = self.rep_mgr.save_pdf("Estoque Atual", self.rep_mgr.generate_stock_list(self.stock.df), "Estoque.pdf")
-                if res: messagebox.showinfo("Sucesso", "PDF Gerado!")
-            except Exception as e: messagebox.showerror("Erro", str(e))
+            path = self.rep_mgr.ask_pdf_path("ABC.pdf" if tipo == "abc" else "Estoque.pdf")
+            if not path: return
+            # Cópia: a planilha pode mudar enquanto o relatório é montado
+            df, history_path = self.stock.df.copy(), self.stock.history_path
+            if tipo == "abc": title, make = f"Curva ABC/XYZ - {label}", lambda: self.rep_mgr.generate_abc(df, history_path, days, location)
+            else: title, make = "Estoque Atual", lambda: self.rep_mgr.generate_stock_list(df, sort, group)
+            self._run_report(ReportJob(self.rep_mgr, path, title, make))
+        ctk.CTkOptionMenu(top, values=list(sorts), variable=var_sort, width=200).pack(pady=(15, 5))
+        ctk.CTkOptionMenu(top, values=list(groups), variable=var_group, width=200).pack(pady=5)
         ctk.CTkButton(top, text="Estoque Atual", command=lambda: gen("stock")).pack(pady=5)
+        ctk.CTkLabel(top, text="Curva ABC/XYZ", font=ctk.CTkFont(weight="bold")).pack(pady=(15, 0))
+        ctk.CTkOptionMenu(top, values=list(windows), variable=var_window, width=200).pack(pady=5)
+        ctk.CTkOptionMenu(top, values=list(locations), variable=var_location, width=200).pack(pady=5)
         ctk.CTkButton(top, text="Curva ABC", command=lambda: gen("abc"), fg_color="#8e44ad").pack(pady=5)
 
+    def _track_job(self, job, title, describe, on_done):
+        """Janela de progresso com Cancelar para um job com progress/cancel()/poll()."""
+        win = ctk.CTkToplevel(self); win.geometry("320x140"); win.attributes("-topmost", True)
+        win.title(title)
+        lbl = ctk.CTkLabel(win, text="Preparando..."); lbl.pack(pady=(20, 5))
+        bar = ctk.CTkProgressBar(win, width=260); bar.set(0); bar.pack(pady=5)
+        btn = ctk.CTkButton(win, text="Cancelar", fg_color="#c0392b", command=lambda: (job.cancel(), btn.configure(state="disabled")))
+        btn.pack(pady=5)
+        win.protocol("WM_DELETE_WINDOW", job.cancel)
+        def poll():
+            res = job.poll()
+            if res is None:
+                done, total = job.progress
+                if total:
+                    bar.set(done / total); lbl.configure(text=describe(done, total))
+                self.after(100, poll); return
+            win.destroy()
+            on_done(*res)
+        self.after(100, poll)
+
+    def _run_report(self, job):
+        def done(status, msg):
+            if status == "ok":
+                try: self.rep_mgr.open_pdf(msg)
+                except Exception: pass
+                messagebox.showinfo("Sucesso", "PDF Gerado!")
+            elif status == "error": messagebox.showerror("Erro", msg)
+        self._track_job(job, "Relatório", lambda d, t: f"Gerando PDF... {d}/{t} linhas", done)
+
+    def action_import_photos(self):
+        if self.stock.df is None or self._loading: return
+        folder = filedialog.askdirectory(title="Pasta com as fotos (nome do arquivo = nome do produto)")
+        if not folder: return
+        job = BulkImageImport(self.img_mgr, folder, self.stock.df.iloc[:, 1].astype(str).tolist())
+        def done(status, summary):
+            # Fotos trocadas: miniaturas em memória não valem mais
+            self.image_cache.clear()
+            if self.selected_item_name: self._display_product_image(self.selected_item_name)
+            if status == "error": messagebox.showerror("Erro", summary); return
+            msg = (f"{summary['imported']} fotos importadas.\n"
+                   f"{summary['unmatched']} sem produto correspondente, {summary['duplicated']} repetidas, "
+                   f"{summary['failed']} com erro.")
+            if status == "cancelled": msg = "Importação cancelada.\n" + msg
+            if summary["report"]: msg += f"\n\nRelatório: {summary['report']}"
+            messagebox.showinfo("Importar Fotos", msg)
+        self._track_job(job, "Importar Fotos", lambda d, t: f"Convertendo fotos... {d}/{t}", done)
+
     def action_history(self):
         if not self.stock.history_path or not os.path.exists(self.stock.history_path): return
-        top = ctk.CTkToplevel(self); top.geometry("800x500"); top.attributes("-topmost", True)
-        tree = ttk.Treeview(top, columns=("D","O","I","Q","X"), show="headings"); tree.pack(fill="both", expand=True)
-        for c in ("D","O","I","Q","X"): tree.heading(c, text=c)
-        with open(self.stock.history_path, "r", encoding="utf-8") as f:
-            for line in reversed(f.readlines()):
-                p = line.strip().split(";;;")
-                if len(p)>=5: tree.insert("", "end", values=p)
+        history_path = self.stock.history_path
+        top = ctk.CTkToplevel(self); top.geometry("950x550"); top.attributes("-topmost", True)
+
+        # Filtros
+        frm = ctk.CTkFrame(top, fg_color="transparent"); frm.pack(fill="x", padx=10, pady=5)
+        en_item = ctk.CTkEntry(frm, placeholder_text="Item...", width=260); en_item.pack(side="left", padx=5)
+        var_op = ctk.StringVar(value="Todas")
+        cmb_op = ctk.CTkComboBox(frm, values=["Todas"], variable=var_op, width=130); cmb_op.pack(side="left", padx=5)
+        en_from = ctk.CTkEntry(frm, placeholder_text="De dd/mm/aaaa", width=120); en_from.pack(side="left", padx=5)
+        en_to = ctk.CTkEntry(frm, placeholder_text="Até dd/mm/aaaa", width=120); en_to.pack(side="left", padx=5)
+        lbl = ctk.CTkLabel(frm, text="Indexando histórico...", text_color="gray70"); lbl.pack(side="right", padx=5)
+
+        frm_tree = ctk.CTkFrame(top, fg_color="transparent"); frm_tree.pack(fill="both", expand=True)
+        scroll = ctk.CTkScrollbar(frm_tree); scroll.pack(side="right", fill="y")
+        cols = (("D", "Data", 140), ("O", "Operação", 100), ("I", "Item", 330), ("Q", "Qtd", 60), ("X", "Detalhe", 220))
+        tree = ttk.Treeview(frm_tree, columns=[c[0] for c in cols], show="headings")
+        for c, text, width in cols: tree.heading(c, text=text); tree.column(c, width=width)
+        tree.pack(fill="both", expand=True)
+        scroll.configure(command=tree.yview)
+
+        # Paginação: só busca a próxima página quando a rolagem chega ao fim
+        state = {"pages": None, "busy": False}
+        def load_more():
+            state["busy"] = False
+            page = next(state["pages"], None) if state["pages"] else None
+            if page is None: state["pages"] = None; return
+            for row in page: tree.insert("", "end", values=row)
+        def on_scroll(lo, hi):
+            scroll.set(lo, hi)
+            if float(hi) >= 0.98 and state["pages"] and not state["busy"]:
+                state["busy"] = True; top.after_idle(load_more)
+        tree.configure(yscrollcommand=on_scroll)
+
+        try: store = HistoryStore.for_history(history_path)
+        except Exception as e: store = None; lbl.configure(text=f"Filtros indisponíveis: {e}")
+        def apply_filters(e=None):
+            try:
+                filters = {"item": en_item.get().strip() or None, "op": None if var_op.get() == "Todas" else var_op.get(),
+                           "date_from": self._br_to_iso(en_from.get()), "date_to": self._br_to_iso(en_to.get(), next_day=True)}
+            except ValueError:
+                messagebox.showerror("Erro", "Data inválida (use dd/mm/aaaa).", parent=top); return
+            tree.delete(*tree.get_children())
+            # Sem filtro não precisa do banco: lê o .txt de trás para frente
+            state["pages"] = store.iter_pages(**filters) if any(filters.values()) else iter_pages_reversed(history_path)
+            load_more()
+        btn_filter = ctk.CTkButton(frm, text="Filtrar", width=80, command=apply_filters, state="disabled")
+        btn_filter.pack(side="left", padx=5)
+
+        # Mais recentes na hora, independente do tamanho do arquivo
+        state["pages"] = iter_pages_reversed(history_path)
+        load_more()
+
+        # Importação incremental do .txt em segundo plano
+        result = queue.Queue()
+        def run():
+            try: result.put(store.sync(history_path) if store else RuntimeError("sem banco"))
+            except Exception as e: result.put(e)
+        def poll():
+            if not top.winfo_exists(): return
+            try: res = result.get_nowait()
+            except queue.Empty: top.after(100, poll); return
+            if isinstance(res, Exception):
+                lbl.configure(text=f"Filtros indisponíveis: {res}"); return
+            lbl.configure(text="")
+            cmb_op.configure(values=["Todas"] + store.operations())
+            btn_filter.configure(state="normal")
+            en_item.bind("<Return>", apply_filters)
+        threading.Thread(target=run, daemon=True).start()
+        top.after(100, poll)
+
+    def _br_to_iso(self, text, next_day=False):
+        """'dd/mm/aaaa' -> 'aaaa-mm-dd' (None se vazio); next_day para limite exclusivo."""
+        text = text.strip()
+        if not text: return None
+        d = datetime.strptime(text, "%d/%m/%Y")
+        if next_day: d += timedelta(days=1)
+        return d.strftime("%Y-%m-%d")
 
     def _check_update_silent(self):
         try:
@@ -0,0 +1,174 @@
+import customtkinter as ctk
+from tkinter import ttk
+import numpy as np
+
+class VirtualTable(ctk.CTkFrame):
+    """Tabela virtual: só as linhas visíveis (+ overscan) viram itens do Treeview.
+
+    Trabalha sobre uma lista de índices lógicos (linhas do DataFrame) já
+    filtrada/ordenada. O iid de cada item é o próprio índice lógico.
+    """
+    def __init__(self, master, columns, render_row, on_select=None, on_heading=None, rowheight=30, overscan=5):
+        super().__init__(master, fg_color="transparent")
+        self.render_row = render_row # idx -> (valores, tag)
+        self.on_select = on_select
+        self.rowheight = rowheight
+        self.overscan = overscan
+
+        self.rows = np.empty(0, dtype=np.int64) # Índices lógicos na ordem de exibição
+        self.first = 0 # Posição (em self.rows) da primeira linha visível
+        self.visible = 20
+        self.selected_index = None
+
+        self.scroll = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scroll.pack(side="right", fill="y")
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in columns], show="headings", selectmode="browse")
+        for key, text, width, anchor in columns:
+            self.tree.heading(key, text=text)
+            if on_heading: self.tree.heading(key, command=lambda k=key: on_heading(k))
+            self.tree.column(key, width=width, anchor=anchor)
+        self.tree.pack(fill="both", expand=True)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_units(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_units(3))
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"), ("<Home>", "home"), ("<End>", "end")):
+            self.tree.bind(key, lambda e, s=step: self._on_key(s))
+
+    # --- DADOS ---
+    def set_rows(self, rows, keep_position=True):
+        """Troca a lista de índices exibidos; renderiza só a janela visível."""
+        self.rows = np.asarray(rows, dtype=np.int64)
+        if not keep_position: self.first = 0
+        if self.selected_index is not None and not self.contains(self.selected_index):
+            self._set_selection(None)
+        self._render()
+
+    def contains(self, idx):
+        return bool(np.any(self.rows == idx))
+
+    def refresh_row(self, idx):
+        """Redesenha uma linha se ela estiver materializada."""
+        iid = str(idx)
+        if self.tree.exists(iid):
+            values, tag = self.render_row(idx)
+            self.tree.item(iid, values=values, tags=(tag,))
+
+    def insert_index(self, idx, ordered=True):
+        """Inclui um índice na visão (na posição ordenada ou no fim)."""
+        pos = int(np.searchsorted(self.rows, idx)) if ordered else len(self.rows)
+        self.rows = np.insert(self.rows, pos, idx)
+        self._render()
+
+    def discard_index(self, idx):
+        """Tira um índice da visão sem alterar os demais."""
+        self.rows = self.rows[self.rows != idx]
+        if self.selected_index == idx: self._set_selection(None)
+        self._render()
+
+    def remove_index(self, idx):
+        """Linha removida do DataFrame: descarta e desloca os índices seguintes."""
+        rows = self.rows[self.rows != idx]
+        rows[rows > idx] -= 1
+        self.rows = rows
+        if self.selected_index == idx: self._set_selection(None)
+        elif self.selected_index is not None and self.selected_index > idx: self.selected_index -= 1
+        self._render()
+
+    # --- SELEÇÃO ---
+    def select(self, idx):
+        """Seleciona pelo índice lógico, rolando até a linha."""
+        if idx is None or not self.contains(idx): return
+        self.see(idx)
+        self._set_selection(idx)
+        if self.tree.exists(str(idx)): self.tree.selection_set(str(idx))
+
+    def clear_selection(self):
+        self._set_selection(None)
+        self.tree.selection_set(())
+
+    def see(self, idx):
+        hits = np.flatnonzero(self.rows == idx)
+        if not len(hits): return
+        pos = int(hits[0])
+        if pos < self.first: self.first = pos
+        elif pos >= self.first + self.visible: self.first = pos - self.visible + 1
+        self._render()
+
+    def neighbors(self, idx, radius=2):
+        """Índices lógicos até `radius` linhas acima/abaixo de idx, os mais próximos primeiro."""
+        hits = np.flatnonzero(self.rows == idx)
+        if not len(hits): return []
+        pos, out = int(hits[0]), []
+        for d in range(1, radius + 1):
+            out += [int(self.rows[p]) for p in (pos + d, pos - d) if 0 <= p < len(self.rows)]
+        return out
+
+    def _set_selection(self, idx):
+        if idx == self.selected_index: return
+        self.selected_index = idx
+        if self.on_select: self.on_select(idx)
+
+    def _on_tree_select(self, e):
+        # Linhas que saem da janela perdem a seleção do Tk, mas não a lógica
+        sel = self.tree.selection()
+        if sel: self._set_selection(int(sel[0]))
+
+    # --- ROLAGEM ---
+    def _render(self):
+        n = len(self.rows)
+        self.first = max(0, min(self.first, n - self.visible))
+        start = max(0, self.first - self.overscan)
+        end = min(n, self.first + self.visible + self.overscan)
+
+        self.tree.delete(*self.tree.get_children())
+        for pos in range(start, end):
+            idx = int(self.rows[pos])
+            values, tag = self.render_row(idx)
+            self.tree.insert("", "end", iid=str(idx), values=values, tags=(tag,))
+
+        # Overscan acima fica fora da área visível
+        self.tree.yview_moveto(0)
+        if self.first > start: self.tree.yview_scroll(self.first - start, "units")
+        if self.selected_index is not None and self.tree.exists(str(self.selected_index)):
+            self.tree.selection_set(str(self.selected_index))
+
+        if n: self.scroll.set(self.first / n, min(1.0, (self.first + self.visible) / n))
+        else: self.scroll.set(0, 1)
+
+    def _scroll_units(self, step):
+        self.first += step
+        self._render()
+        return "break"
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.first = int(float(args[0]) * len(self.rows))
+        elif action == "scroll":
+            step = int(args[0])
+            self.first += step * self.visible if args[1] == "pages" else step
+        self._render()
+
+    def _on_wheel(self, e):
+        return self._scroll_units(-int(e.delta / 40) if abs(e.delta) >= 40 else (-1 if e.delta > 0 else 1))
+
+    def _on_configure(self, e):
+        visible = max(1, e.height // self.rowheight - 1) # Desconta o cabeçalho
+        if visible != self.visible:
+            self.visible = visible
+            self._render()
+
+    def _on_key(self, step):
+        n = len(self.rows)
+        if not n: return "break"
+        hits = np.flatnonzero(self.rows == self.selected_index) if self.selected_index is not None else []
+        pos = int(hits[0]) if len(hits) else self.first - 1
+        if step == "home": pos = 0
+        elif step == "end": pos = n - 1
+        elif step == "page": pos += self.visible
+        elif step == "-page": pos -= self.visible
+        else: pos += step
+        self.select(int(self.rows[max(0, min(pos, n - 1))]))
+        return "break"